@@ -1,16 +1,35 @@
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-import pandas as pd
-import os
-import spotipy
-from spotipy.oauth2 import SpotifyOAuth, SpotifyClientCredentials
-import random
 import time
+_IMPORT_STARTED = time.perf_counter()
+
+from flask import Flask, render_template, request, jsonify, session, redirect, url_for, Response
+import hmac
+import json
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
 from datetime import timedelta 
+from catalog import CatalogManager
+from catalog_schema import decode_track_ids
+from session_store import create_session_interface
+from spotify_scheduler import SpotifyScheduler, PRIORITY_INTERACTIVE, SCHEDULER_CLIENT_KWARGS
+from metadata_store import MetadataStore, track_to_metadata
+
+# pandas and spotipy are imported lazily (inside the functions that use them),
+# so the web process can bind its port before paying for those imports.
 
 app = Flask(__name__)
 app.secret_key = "super_secret_valora_key_123"
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(minutes=5)
 
+# Sessions live server-side; the cookie only carries an opaque session id.
+# VALORA_SESSION_BACKEND: 'sqlite' (default, shared by workers on one machine), 'memory' or 'cookie' (Flask default)
+SESSION_BACKEND = os.environ.get("VALORA_SESSION_BACKEND", "sqlite")
+SESSION_DB = os.environ.get("VALORA_SESSION_DB", "valora_sessions.db")
+_session_interface = create_session_interface(SESSION_BACKEND, SESSION_DB)
+if _session_interface is not None:
+    app.session_interface = _session_interface
+
 # --- Configuration ---
 # the client id will be set via environment variables for security
 CLIENT_ID = os.environ.get("SPOTIFY_CLIENT_ID")
@@ -23,41 +42,98 @@ if not CLIENT_ID or not CLIENT_SECRET:
 
 # Update this to your Render URL when pushing to live, 
 # or keep as localhost for testing on your computer.
-REDIRECT_URI = "https://valora-music.onrender.com/callback"  # For Render deployment
+REDIRECT_URI = os.environ.get("SPOTIFY_REDIRECT_URI", "https://valora-music.onrender.com/callback")  # For Render deployment
 
-# --- 1. Load Processed Song Database (The "Brain") ---
-DATABASE_FILE = 'valora_database.csv' 
-try:
-    print(f"Loading recommendation database: {DATABASE_FILE}...")
-    df_db = pd.read_csv(DATABASE_FILE)
-    df_db['app_mood'] = df_db['app_mood'].astype('category')
-    df_db['artist_simple'] = df_db['artists'].astype(str).str.lower().str.split(';').str[0].str.split(',').str[0]
-    print(f"✅ Recommendation database loaded ({len(df_db)} tracks).")
-except FileNotFoundError:
-    print(f"🚨 FATAL ERROR: Could not find '{DATABASE_FILE}'.")
-    print("Please run 'process_final_database.py' first.")
-    exit()
+# Point these at a local stand-in (see benchmarks/fake_spotify.py) to run without real Spotify
+SPOTIFY_API_URL = os.environ.get("SPOTIFY_API_URL")
+SPOTIFY_ACCOUNTS_URL = os.environ.get("SPOTIFY_ACCOUNTS_URL")
+
+# Fast-start mode: bind immediately and load the data files in a background thread.
+# Until loading finishes, /readyz returns 503 and the API asks clients to retry.
+FAST_START = os.environ.get("VALORA_FAST_START", "0").lower() in ("1", "true", "yes")
 
-# --- 2. Load Liked Songs Database (For Personalization) ---
+# --- 1. Song Database + Liked Songs (The "Brain") ---
+# Both files are loaded into an immutable snapshot by the catalog manager,
+# which can swap in a rebuilt catalog without restarting the workers.
+DATABASE_FILE = 'valora_database.csv' 
 LIKED_SONGS_FILE = 'Liked_Songs_Spotify.csv'
-try:
-    df_liked = pd.read_csv(LIKED_SONGS_FILE)
-    liked_song_ids = set(df_liked['Track URI'].str.split(':').str[2])
-    print(f"✅ Loaded {len(liked_song_ids)} liked song IDs from CSV.")
-except Exception:
-    print(f"Warning: '{LIKED_SONGS_FILE}' not found or invalid. Personalization will be limited.")
-    liked_song_ids = set()
+
+# Seconds between checks for a new valora_database.csv (0 disables the watcher)
+CATALOG_WATCH_SECONDS = float(os.environ.get("VALORA_CATALOG_WATCH_SECONDS", "30"))
+# Shared secret for POST /admin/reload_catalog (the endpoint is disabled when unset)
+ADMIN_TOKEN = os.environ.get("VALORA_ADMIN_TOKEN")
+
+# How to fill the non-liked part of a playlist: 'weighted' samples by mood-model confidence,
+# 'ranked' takes the most confident tracks, 'uniform' ignores confidence.
+# Per-user boosts (liked songs, liked artists) apply on top in every mode but 'ranked'.
+MOOD_SAMPLING = os.environ.get("VALORA_MOOD_SAMPLING", "weighted")
+LIKED_BOOST = float(os.environ.get("VALORA_LIKED_BOOST", "2.0"))
+ARTIST_BOOST = float(os.environ.get("VALORA_ARTIST_BOOST", "1.0"))
+catalog = CatalogManager(DATABASE_FILE, LIKED_SONGS_FILE, use_mood_confidence=MOOD_SAMPLING != 'uniform')
+
+# --- Startup State ---
+startup_info = {
+    'mode': 'fast' if FAST_START else 'eager',
+    'import_s': None,         # time to import app.py (until the server can bind)
+    'catalog_load_s': None,   # pandas import + reading/deriving the data files
+    'spotipy_import_s': None,
+    'ready_s': None,          # from import start until the app can serve recommendations
+}
+
+def load_app_data():
+    """
+    Loads the first catalog snapshot and starts watching for new ones.
+    Returns True on success; on failure the error is kept on the catalog manager.
+    """
+    t0 = time.perf_counter()
+    if not catalog.load():
+        return False
+    startup_info['catalog_load_s'] = round(time.perf_counter() - t0, 4)
+
+    # Warm the spotipy import too, so the first request doesn't pay for it
+    t0 = time.perf_counter()
+    import spotipy
+    startup_info['spotipy_import_s'] = round(time.perf_counter() - t0, 4)
+
+    startup_info['ready_s'] = round(time.perf_counter() - _IMPORT_STARTED, 4)
+    print(f"✅ App ready in {startup_info['ready_s']}s ({startup_info['mode']} start).")
+    catalog.start_watching(CATALOG_WATCH_SECONDS)
+    return True
+
+def data_not_ready_response():
+    if catalog.error:
+        return jsonify({'error': 'Recommendation database is unavailable.'}), 503
+    resp = jsonify({'error': 'Recommendation database is still loading, please retry shortly.'})
+    resp.headers['Retry-After'] = '2'
+    return resp, 503
 
 # --- Spotify Authentication Setup ---
+def use_spotify_endpoints(obj):
+    # Redirects a spotipy client or auth manager to SPOTIFY_API_URL / SPOTIFY_ACCOUNTS_URL when set
+    if SPOTIFY_API_URL and hasattr(obj, 'prefix'):
+        obj.prefix = SPOTIFY_API_URL.rstrip('/') + '/'
+    if SPOTIFY_ACCOUNTS_URL and hasattr(obj, 'OAUTH_TOKEN_URL'):
+        obj.OAUTH_TOKEN_URL = SPOTIFY_ACCOUNTS_URL.rstrip('/') + '/api/token'
+        if hasattr(obj, 'OAUTH_AUTHORIZE_URL'):
+            obj.OAUTH_AUTHORIZE_URL = SPOTIFY_ACCOUNTS_URL.rstrip('/') + '/authorize'
+    return obj
+
 def create_spotify_oauth():
-    return SpotifyOAuth(
+    from spotipy.oauth2 import SpotifyOAuth
+    return use_spotify_endpoints(SpotifyOAuth(
         client_id=CLIENT_ID, 
         client_secret=CLIENT_SECRET, 
         redirect_uri=REDIRECT_URI,
         scope=SCOPE,
         show_dialog=True
-    )
-sp_oauth = create_spotify_oauth()
+    ))
+
+_sp_oauth = None
+def get_sp_oauth():
+    global _sp_oauth
+    if _sp_oauth is None:
+        _sp_oauth = create_spotify_oauth()
+    return _sp_oauth
 
 def get_spotify_client():
     token_info = session.get('token_info', None)
@@ -65,23 +141,184 @@ def get_spotify_client():
     now = int(time.time()); is_expired = token_info.get('expires_at', 0) - now < 60
     if is_expired:
         try:
-            token_info = sp_oauth.refresh_access_token(token_info.get('refresh_token'))
+            token_info = get_sp_oauth().refresh_access_token(token_info.get('refresh_token'))
             session['token_info'] = token_info
         except Exception as e: 
             print(f"Error refreshing token: {e}"); session.clear(); return None, True
     try:
-        sp = spotipy.Spotify(auth=token_info.get('access_token'))
+        import spotipy
+        sp = use_spotify_endpoints(spotipy.Spotify(auth=token_info.get('access_token')))
         sp.current_user(); return sp, False
     except Exception as e: 
         print(f"Error creating user client: {e}"); session.clear(); return None, True
 
-def get_spotify_client_credentials():
+def get_spotify_client_credentials(**client_kwargs):
     try:
-        client_credentials_manager = SpotifyClientCredentials(client_id=CLIENT_ID, client_secret=CLIENT_SECRET)
-        return spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+        import spotipy
+        from spotipy.oauth2 import SpotifyClientCredentials
+        client_credentials_manager = use_spotify_endpoints(SpotifyClientCredentials(client_id=CLIENT_ID, client_secret=CLIENT_SECRET))
+        return use_spotify_endpoints(spotipy.Spotify(client_credentials_manager=client_credentials_manager, **client_kwargs))
     except Exception as e: 
         print(f"Error creating client credentials client: {e}"); return None
 
+# --- Shared Spotify Scheduler ---
+# All track lookups share one token bucket. spotipy's own retries are off and 429s
+# reach the scheduler with their Retry-After, so it alone decides how to back off.
+SPOTIFY_RATE_PER_S = float(os.environ.get("VALORA_SPOTIFY_RATE", "10"))
+SPOTIFY_BURST = int(os.environ.get("VALORA_SPOTIFY_BURST", "20"))
+SPOTIFY_LOOKUP_TIMEOUT = float(os.environ.get("VALORA_SPOTIFY_TIMEOUT", "10"))
+
+spotify_scheduler = SpotifyScheduler(
+    lambda: get_spotify_client_credentials(**SCHEDULER_CLIENT_KWARGS),
+    rate_per_s=SPOTIFY_RATE_PER_S,
+    burst=SPOTIFY_BURST,
+)
+
+# --- Offline Metadata Store ---
+# Filled by `process_final_database.py --enrich-metadata`; live lookups are written back too,
+# so each track only goes to Spotify when it is new or older than METADATA_MAX_AGE_S.
+METADATA_DB = os.environ.get("VALORA_METADATA_DB", "valora_metadata.db")
+METADATA_MAX_AGE_S = float(os.environ.get("VALORA_METADATA_MAX_AGE_DAYS", "30")) * 86400
+
+metadata_store = MetadataStore(METADATA_DB)
+
+def save_track_metadata(tracks_details):
+    try:
+        metadata_store.put_many([track_to_metadata(t) for t in tracks_details])
+    except Exception as e:
+        print(f"Warning: Could not save track metadata: {e}")
+
+def save_prefetched_metadata(future):
+    # Runs on a scheduler thread once a background refresh finishes
+    if future.result():
+        save_track_metadata([future.result()])
+
+def lookup_stored_metadata(track_ids):
+    """
+    Reads the local store. Returns (known, missing): stale entries are in `known`
+    and get refreshed in the background; `missing` have to be fetched now.
+    """
+    try:
+        known = metadata_store.get_many(track_ids)
+    except Exception as e:
+        print(f"Warning: Could not read track metadata store: {e}")
+        known = {}
+    cutoff = time.time() - METADATA_MAX_AGE_S
+    missing = [tid for tid in track_ids if tid not in known]
+    stale = [tid for tid, meta in known.items() if meta['fetched_at'] < cutoff]
+
+    if stale:
+        for future in spotify_scheduler.prefetch(stale).values():
+            future.add_done_callback(save_prefetched_metadata)
+    print(f"Track metadata: {len(track_ids) - len(missing)} from local store ({len(stale)} stale), {len(missing)} to look up live.")
+    return known, missing
+
+def resolve_track_metadata(track_ids):
+    """
+    Returns {track_id: metadata} for as many ids as possible. Fresh entries come from
+    the local store; missing ones are fetched now, stale ones are served as-is and
+    refreshed in the background.
+    """
+    known, missing = lookup_stored_metadata(track_ids)
+    if missing:
+        # Details come from the shared scheduler, which batches, coalesces and rate-limits tracks() calls
+        tracks_details = spotify_scheduler.get_tracks(missing, priority=PRIORITY_INTERACTIVE,
+                                                      timeout=SPOTIFY_LOOKUP_TIMEOUT)
+        save_track_metadata(tracks_details.values())
+        known.update({tid: track_to_metadata(t) for tid, t in tracks_details.items()})
+    return known
+
+def iter_track_metadata(track_ids):
+    """
+    Like resolve_track_metadata, but yields {track_id: metadata} batches as they
+    resolve: everything the local store has first, then each batch of live lookups
+    as its tracks() call completes. Ids still unresolved after the lookup timeout
+    are never yielded.
+    """
+    known, missing = lookup_stored_metadata(track_ids)
+    if known:
+        yield known
+    if not missing:
+        return
+
+    futures = spotify_scheduler.submit(missing, priority=PRIORITY_INTERACTIVE)
+    ids_by_future = {future: tid for tid, future in futures.items()}
+    pending = set(ids_by_future)
+    deadline = time.monotonic() + SPOTIFY_LOOKUP_TIMEOUT
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break  # Timed out; the caller falls back to catalog data for the rest
+        tracks_details = {ids_by_future[f]: f.result() for f in done if f.result() is not None}
+        if tracks_details:
+            save_track_metadata(tracks_details.values())
+            yield {tid: track_to_metadata(t) for tid, t in tracks_details.items()}
+
+def metadata_to_recommendation(meta, super_genre):
+    return {
+        'id': meta['track_id'], 
+        'name': meta['name'],
+        'artist': meta['artist'],
+        'album_art': meta['album_art'],
+        'preview_url': meta['preview_url'], # Keep for script, even if hidden
+        'super_genre': super_genre,
+        'url': meta['url']
+    }
+
+def catalog_to_recommendation(track_id, db_song):
+    # Used when Spotify can't be reached: no album art, but still a playable link
+    artists = db_song['artists'] if isinstance(db_song['artists'], str) else ''
+    return {
+        'id': track_id,
+        'name': db_song['track_name'] if isinstance(db_song['track_name'], str) else None,
+        'artist': artists.split(';')[0].split(',')[0] if artists else 'N/A',
+        'album_art': None,
+        'preview_url': None,
+        'super_genre': db_song['super_genre'],
+        'url': f"https://open.spotify.com/track/{track_id}"
+    }
+
+# --- Health Checks ---
+@app.route('/healthz')
+def healthz():
+    # Liveness: the process is up and serving, even if data is still loading
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    # Readiness: the catalog is loaded and recommendations can be served
+    snapshot = catalog.current()
+    ready = snapshot is not None
+    status = 'ready' if ready else ('failed' if catalog.error else 'loading')
+    return jsonify({
+        'status': status,
+        'startup': startup_info,
+        'catalog': snapshot.info() if snapshot else None,
+        'error': catalog.error,
+    }), 200 if ready else 503
+
+# --- Admin: Reload Catalog ---
+@app.route('/admin/reload_catalog', methods=['POST'])
+def reload_catalog():
+    """
+    Rebuilds the catalog of the worker process that receives the request.
+    Under gunicorn with several workers the others are not told: they pick
+    up the new files on their next watcher check (CATALOG_WATCH_SECONDS),
+    or restart together with `kill -HUP <gunicorn master pid>`.
+    """
+    if not ADMIN_TOKEN: return jsonify({'error': 'Not found'}), 404
+    token = request.headers.get('X-Admin-Token', '')
+    if not hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()): return jsonify({'error': 'Forbidden'}), 403
+    # Build happens in the background; the new snapshot is swapped in when ready
+    catalog.reload(reason='admin endpoint')
+    snapshot = catalog.current()
+    return jsonify({
+        'status': 'reloading',
+        'scope': 'this worker only; other workers follow on their next file check',
+        'worker_pid': os.getpid(),
+        'current_version': snapshot.version if snapshot else None,
+    }), 202
+
 # --- Flask Routes ---
 @app.route('/')
 def index():
@@ -94,14 +331,14 @@ def index():
     return render_template('index.html')
 
 @app.route('/login')
-def login(): return redirect(sp_oauth.get_authorize_url())
+def login(): return redirect(get_sp_oauth().get_authorize_url())
 
 @app.route('/callback')
 def callback():
     session.clear(); code = request.args.get('code')
     session.permanent = True
     try:
-        token_info = sp_oauth.get_access_token(code, check_cache=False)
+        token_info = get_sp_oauth().get_access_token(code, check_cache=False)
         session['token_info'] = token_info
         # --- THIS IS CHANGED ---
         # Redirect to remarks page after login
@@ -145,12 +382,152 @@ def recommendations():
 
     return render_template('recommendations.html', mood=user_mood, mood_class=mood_class)
 
+# --- Recommendation Sampling ---
+def pick_track_ids(track_ids, liked_positions, total=20, max_liked=8, weights=None, ranked=False, overlay=None):
+    """
+    Picks up to `max_liked` of the user's liked songs (`liked_positions`
+    in the mood bucket whose ids are `track_ids`), then fills the rest of
+    the playlist with songs from the same bucket: uniformly at random, or
+    by weight when `weights` (the bucket's CumulativeWeights) is given,
+    plus any per-user `overlay` boosts. Returns (track_ids, num_liked, num_general).
+    """
+    import numpy as np
+    rng = np.random.default_rng()
+
+    num_liked = min(len(liked_positions), max_liked) 
+    chosen = [int(p) for p in rng.choice(liked_positions, size=num_liked, replace=False)] if num_liked else []
+    
+    num_general = total - len(chosen)
+    available = len(track_ids) - len(chosen)
+    general = []
+    
+    if available > 0:
+        num_general = min(available, num_general) 
+        if weights is not None and ranked:
+            general = weights.top(num_general, exclude=chosen)
+        elif weights is not None:
+            general = weights.draw(num_general, exclude=chosen, rng=rng, overlay=overlay)
+        else:
+            # Draw a few extra so we can drop any that were already picked as liked songs
+            candidates = rng.choice(len(track_ids), size=min(len(track_ids), num_general + len(chosen)), replace=False)
+            taken = set(chosen)
+            general = [int(p) for p in candidates if int(p) not in taken][:num_general]
+        chosen.extend(general)
+    
+    # What was actually drawn, which can be fewer than asked for
+    return decode_track_ids(track_ids[chosen]), num_liked, len(general)
+
+def fetch_user_liked(sp_user, snapshot):
+    """The shared liked songs merged with the user's live saved tracks, as catalog rows (RowSet)."""
+    saved_track_ids = []
+    try:
+        saved_tracks = sp_user.current_user_saved_tracks(limit=50)
+        saved_track_ids = [item['track']['id'] for item in saved_tracks['items'] if item.get('track')]
+    except Exception as e:
+        print(f"Warning: Could not get user's live liked songs: {e}.")
+    # Catalog rows, not id strings: the shared liked set is never copied, only merged with the live saves
+    user_liked = snapshot.user_liked(saved_track_ids)
+    print(f"Personalizing with {len(user_liked)} total liked songs.")
+    return user_liked
+
+def recommend_for_mood(snapshot, mood, user_liked, total=20):
+    """Samples one mood's playlist. Returns (track_ids, message); no Spotify calls."""
+    bucket_track_ids = snapshot.mood_track_ids(mood)
+    if not len(bucket_track_ids):
+        return [], f'No songs found for mood "{mood}".'
+
+    liked_positions = snapshot.liked_positions(mood, user_liked)
+    overlay = snapshot.user_overlay(mood, user_liked, liked_positions,
+                                    liked_boost=LIKED_BOOST, artist_boost=ARTIST_BOOST)
+    ranked = MOOD_SAMPLING == 'ranked'
+    # Ranking needs the confidence weights (none means a uniform fallback); a flat
+    # sampler would just rank the bucket in file order
+    weights = snapshot.mood_weights.get(mood) if ranked else snapshot.mood_samplers.get(mood)
+    final_track_ids, num_liked, num_general = pick_track_ids(bucket_track_ids, liked_positions,
+                                                             total=total, max_liked=total * 2 // 5,
+                                                             weights=weights, ranked=ranked, overlay=overlay)
+    if not final_track_ids:
+        return [], 'No songs found.'
+    if num_liked > 0:
+         message = f"Here are {len(final_track_ids)} songs for you ({num_liked} from your preferences, {num_general} new):"
+    else:
+         message = f"Here are {len(final_track_ids)} songs from our library for you:"
+    print(message)
+    return final_track_ids, message
+
+def build_recommendations(snapshot, track_ids, tracks_metadata):
+    """Display dicts for `track_ids`, in order, from resolved metadata or the catalog as a fallback."""
+    final_songs_df = snapshot.songs_by_id(track_ids)
+    recommendations_list = []
+    for track_id in track_ids:
+        db_song = final_songs_df.loc[track_id]
+        meta = tracks_metadata.get(track_id)
+        if meta:
+            recommendations_list.append(metadata_to_recommendation(meta, db_song['super_genre']))
+        else:
+            # Spotify didn't answer in time; fall back to what the catalog knows
+            recommendations_list.append(catalog_to_recommendation(track_id, db_song))
+    return recommendations_list
+
+# --- Streaming Responses ---
+# With `Accept: application/x-ndjson` (or ?stream=1) /get_recommendations answers with one
+# JSON object per line instead of a single document:
+#   {"type": "start", "message": ..., "ids": [...]}            playlist order, sent before any lookup
+#   {"type": "tracks", "items": [{"index": i, ...song}, ...]}  one line per resolved batch
+#   {"type": "done", "resolved": n, "fallback": m}
+# so the first songs render as soon as the local store or the first tracks() call answers,
+# however long the playlist is. Errors after the headers are sent come as {"type": "error"}.
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+def wants_stream():
+    if request.args.get('stream') in ('1', 'true', 'ndjson'):
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+def ndjson_line(obj):
+    return json.dumps(obj, separators=(',', ':')) + '\n'
+
+def stream_recommendations(snapshot, track_ids, message):
+    """Generator for the NDJSON body. Uses only its arguments, so it is safe outside the request context."""
+    yield ndjson_line({'type': 'start', 'message': message, 'ids': track_ids})
+    try:
+        songs = snapshot.songs_by_id(track_ids)
+        indexes = {}
+        for i, tid in enumerate(track_ids):
+            indexes.setdefault(tid, []).append(i)
+        sent = set()
+
+        for batch in iter_track_metadata(track_ids):
+            items = []
+            for tid, meta in batch.items():
+                if tid in sent or tid not in indexes:
+                    continue
+                sent.add(tid)
+                song = metadata_to_recommendation(meta, songs.loc[tid]['super_genre'])
+                items.extend(dict(song, index=i) for i in indexes[tid])
+            if items:
+                yield ndjson_line({'type': 'tracks', 'items': items})
+
+        # Spotify didn't answer in time for these; fall back to what the catalog knows
+        fallback = [dict(catalog_to_recommendation(tid, songs.loc[tid]), index=i)
+                    for tid in indexes if tid not in sent for i in indexes[tid]]
+        if fallback:
+            yield ndjson_line({'type': 'tracks', 'items': fallback})
+        print(f"Streamed details for {len(sent)} of {len(indexes)} songs.")
+        yield ndjson_line({'type': 'done', 'resolved': len(sent), 'fallback': len(indexes) - len(sent)})
+    except Exception as e:
+        print(f"!! Error while streaming recommendations: {e}")
+        import traceback; traceback.print_exc()
+        yield ndjson_line({'type': 'error', 'error': 'An internal server error occurred.'})
+
 # --- API: Get Recommendations ---
 @app.route('/get_recommendations', methods=['POST'])
 def get_recommendations():
     print("--- Received request at /get_recommendations ---")
     sp_user, needs_redirect = get_spotify_client()
     if needs_redirect: return jsonify({'error': 'User not logged in', 'login_required': True}), 401
+    snapshot = catalog.current()  # Use one snapshot for the whole request, even if a reload lands
+    if snapshot is None: return data_not_ready_response()
     
     try:
         data = request.get_json()
@@ -159,78 +536,126 @@ def get_recommendations():
         if not user_mood: return jsonify({'error': 'Mood not provided'}), 400
         print(f"Target mood: {user_mood}")
 
-        mood_filtered_songs = df_db[df_db['app_mood'] == user_mood]
-        
-        if mood_filtered_songs.empty:
+        if not len(snapshot.mood_track_ids(user_mood)):
             return jsonify({'recommendations': [], 'message': f'No songs found for mood "{user_mood}".'})
         
-        user_liked_ids = liked_song_ids.copy() 
-        try:
-            saved_tracks = sp_user.current_user_saved_tracks(limit=50)
-            user_liked_ids.update([item['track']['id'] for item in saved_tracks['items']])
-            print(f"Personalizing with {len(user_liked_ids)} total liked songs.")
-        except Exception as e:
-            print(f"Warning: Could not get user's live liked songs: {e}.")
-
-        matches_liked = mood_filtered_songs[mood_filtered_songs['track_id'].isin(user_liked_ids)]
-        num_liked = min(len(matches_liked), 8) 
-        liked_recs = matches_liked.sample(n=num_liked)
-        
-        final_track_ids = list(liked_recs['track_id'])
-        
-        num_general = 20 - len(final_track_ids)
-        
-        general_mood_songs = mood_filtered_songs[~mood_filtered_songs['track_id'].isin(final_track_ids)]
-        
-        if len(general_mood_songs) > 0:
-            num_general = min(len(general_mood_songs), num_general) 
-            general_recs = general_mood_songs.sample(n=num_general)
-            final_track_ids.extend(list(general_recs['track_id']))
-        
-        if num_liked > 0:
-             message = f"Here are {len(final_track_ids)} songs for you ({num_liked} from your preferences, {num_general} new):"
-        else:
-             message = f"Here are {len(final_track_ids)} songs from our library for you:"
-        print(message)
-            
+        user_liked = fetch_user_liked(sp_user, snapshot)
+        final_track_ids, message = recommend_for_mood(snapshot, user_mood, user_liked)
         if not final_track_ids:
-             return jsonify({'recommendations': [], 'message': 'No songs found.'})
+             return jsonify({'recommendations': [], 'message': message})
 
-        sp_cc = get_spotify_client_credentials()
-        if not sp_cc: return jsonify({'error': 'Could not connect to Spotify for details.'}), 500
-        
-        recommendations_list = []
-        final_songs_df = df_db[df_db['track_id'].isin(final_track_ids)]
-        
-        for i in range(0, len(final_track_ids), 50):
-            batch_ids = final_track_ids[i:i+50]
-            try:
-                tracks_details = sp_cc.tracks(batch_ids)['tracks']
-                for track_detail in tracks_details:
-                        if track_detail:
-                            db_song = final_songs_df[final_songs_df['track_id'] == track_detail['id']].iloc[0]
-                            
-                            recommendations_list.append({
-                                'id': track_detail['id'], 
-                                'name': track_detail.get('name'),
-                                'artist': track_detail['artists'][0]['name'] if track_detail.get('artists') else 'N/A',
-                                'album_art': track_detail['album']['images'][0]['url'] if track_detail.get('album') and track_detail['album']['images'] else None,
-                                'preview_url': track_detail.get('preview_url'), # Keep for script, even if hidden
-                                'super_genre': db_song['super_genre'],
-                                'url': track_detail['external_urls']['spotify'] if track_detail.get('external_urls') else None
-                            })
-            except Exception as e:
-                print(f"Error getting Spotify track details batch: {e}")
-
-        print(f"Successfully fetched details for {len(recommendations_list)} songs.")
-        final_recs_sorted = sorted(recommendations_list, key=lambda x: final_track_ids.index(x['id']))
+        if wants_stream():
+            return Response(stream_recommendations(snapshot, final_track_ids, message),
+                            mimetype=NDJSON_MIMETYPE, headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+        tracks_metadata = resolve_track_metadata(final_track_ids)
+        recommendations_list = build_recommendations(snapshot, final_track_ids, tracks_metadata)
+        print(f"Successfully fetched details for {len(tracks_metadata)} of {len(recommendations_list)} songs.")
         
-        return jsonify({'recommendations': final_recs_sorted, 'message': message})
+        return jsonify({'recommendations': recommendations_list, 'message': message})
     except Exception as e:
         print(f"!! Critical Error in /get_recommendations: {e}"); 
         import traceback; traceback.print_exc()
         return jsonify({'error': 'An internal server error occurred.'}), 500
 
+# --- API: Get Recommendations for Several Moods ---
+BATCH_MAX_MOODS = 8
+BATCH_MAX_TRACKS = 100
+
+def allocate_playlist_sizes(mood_weights, total):
+    """Splits `total` tracks across moods in proportion to their weights (largest remainder)."""
+    # Relative to the largest weight first, so huge weights can't overflow the sum
+    largest = max(mood_weights.values())
+    relative = {mood: w / largest for mood, w in mood_weights.items()}
+    weight_sum = sum(relative.values())
+    exact = {mood: total * w / weight_sum for mood, w in relative.items()}
+    sizes = {mood: int(x) for mood, x in exact.items()}
+    leftover = total - sum(sizes.values())
+    for mood in sorted(exact, key=lambda m: exact[m] - sizes[m], reverse=True)[:leftover]:
+        sizes[mood] += 1
+    return sizes
+
+def parse_batch_request(data):
+    """
+    Returns ({mood: playlist size}, None) or (None, error message).
+    `moods` is either a list (a full playlist of `total` songs per mood) or
+    a {mood: weight} dict (`total` songs split across the moods by weight).
+    """
+    if not isinstance(data, dict):
+        data = {}  # A JSON list or scalar body: reported as missing moods below
+    moods = data.get('moods')
+    total = data.get('total', 20)
+    if not isinstance(total, int) or isinstance(total, bool) or not 1 <= total <= BATCH_MAX_TRACKS:
+        return None, f'total must be an integer between 1 and {BATCH_MAX_TRACKS}'
+    if isinstance(moods, list) and moods and all(isinstance(m, str) and m for m in moods):
+        moods = list(dict.fromkeys(moods))
+        if len(moods) > BATCH_MAX_MOODS:
+            return None, f'At most {BATCH_MAX_MOODS} moods per request'
+        if total * len(moods) > BATCH_MAX_TRACKS:
+            return None, f'At most {BATCH_MAX_TRACKS} songs per request'
+        return {mood: total for mood in moods}, None
+    if isinstance(moods, dict) and moods:
+        if len(moods) > BATCH_MAX_MOODS:
+            return None, f'At most {BATCH_MAX_MOODS} moods per request'
+        weights = {}
+        for mood, weight in moods.items():
+            # Compared before float(), which overflows on huge JSON integers
+            if not isinstance(weight, (int, float)) or isinstance(weight, bool) or not 0 <= weight <= sys.float_info.max:
+                return None, f'Weight for "{mood}" must be a non-negative number'
+            weights[mood] = float(weight)
+        if not max(weights.values()) > 0:
+            return None, 'At least one mood weight must be positive'
+        return allocate_playlist_sizes(weights, total), None
+    return None, 'Moods not provided (a list of moods or a {mood: weight} object)'
+
+@app.route('/get_recommendations_batch', methods=['POST'])
+def get_recommendations_batch():
+    """
+    Several playlists in one call, e.g. {"moods": ["Happy/Energetic", "Calm/Peaceful"]}
+    or {"moods": {"Happy/Energetic": 0.7, "Calm/Peaceful": 0.3}, "total": 20}.
+    The login check, liked-songs fetch and metadata lookup happen once for all
+    playlists; only the sampling is done per mood.
+    """
+    print("--- Received request at /get_recommendations_batch ---")
+    sp_user, needs_redirect = get_spotify_client()
+    if needs_redirect: return jsonify({'error': 'User not logged in', 'login_required': True}), 401
+    snapshot = catalog.current()  # One snapshot for every playlist in the batch
+    if snapshot is None: return data_not_ready_response()
+
+    try:
+        sizes, error = parse_batch_request(request.get_json(silent=True) or {})
+        if error: return jsonify({'error': error}), 400
+        print(f"Target moods: {sizes}")
+
+        # Skip the saved-tracks call when no requested mood has any songs
+        if any(size and len(snapshot.mood_track_ids(mood)) for mood, size in sizes.items()):
+            user_liked = fetch_user_liked(sp_user, snapshot)
+        else:
+            user_liked = snapshot.liked
+
+        playlists = []
+        for mood, size in sizes.items():
+            if size == 0:
+                track_ids, message = [], 'No songs requested for this mood.'
+            else:
+                track_ids, message = recommend_for_mood(snapshot, mood, user_liked, total=size)
+            playlists.append((mood, track_ids, message))
+
+        # One lookup for every playlist; a track in two playlists is only fetched once
+        all_track_ids = list(dict.fromkeys(tid for _, track_ids, _ in playlists for tid in track_ids))
+        tracks_metadata = resolve_track_metadata(all_track_ids) if all_track_ids else {}
+        print(f"Successfully fetched details for {len(tracks_metadata)} of {len(all_track_ids)} songs.")
+
+        return jsonify({'playlists': [
+            {'mood': mood, 'recommendations': build_recommendations(snapshot, track_ids, tracks_metadata),
+             'message': message}
+            for mood, track_ids, message in playlists
+        ]})
+    except Exception as e:
+        print(f"!! Critical Error in /get_recommendations_batch: {e}"); 
+        import traceback; traceback.print_exc()
+        return jsonify({'error': 'An internal server error occurred.'}), 500
+
 # --- API: Add ALL Tracks to Playlist ---
 @app.route('/add_all_to_playlist', methods=['POST'])
 def add_all_to_playlist():
@@ -281,6 +706,15 @@ def add_all_to_playlist():
             return jsonify({'error': f'Could not add songs: {e}'}), 500
     else: return jsonify({'error': 'Playlist ID missing.'}), 500
 
+# --- Start Loading Data ---
+startup_info['import_s'] = round(time.perf_counter() - _IMPORT_STARTED, 4)
+if FAST_START:
+    threading.Thread(target=load_app_data, name='valora-data-loader', daemon=True).start()
+    print(f"Fast start: app imported in {startup_info['import_s']}s, loading data in the background...")
+elif not load_app_data():
+    exit()
+catalog.install_signal_handler()
+
 # --- Run App ---
 if __name__ == '__main__':
     if CLIENT_ID == "YOUR_CLIENT_ID_HERE":
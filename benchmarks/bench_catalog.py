@@ -0,0 +1,106 @@
+# In benchmarks/bench_catalog.py
+"""
+Micro-benchmarks for the hot paths of the recommendation flow.
+
+    pip install -r benchmarks/requirements.txt
+    pytest benchmarks/ --benchmark-autosave      # save a baseline
+    pytest benchmarks/ --benchmark-compare       # compare against it
+"""
+import catalog
+import catalog_schema
+import dataprocessing
+import pandas as pd
+import synthetic
+
+def test_catalog_load(benchmark, valora_app, bench_workdir):
+    df, track_ids = benchmark(catalog_schema.read_catalog, str(bench_workdir / 'valora_database.csv'))
+    assert len(df) == len(track_ids) == len(valora_app.catalog.current().df)
+
+def test_snapshot_build(benchmark, valora_app, bench_workdir):
+    # Index building that a hot reload does off the request path
+    current = valora_app.catalog.current()
+    liked_song_ids = catalog.load_liked_song_ids(str(bench_workdir / 'Liked_Songs_Spotify.csv'))
+    snapshot = benchmark(catalog.CatalogSnapshot, current.df, current.track_ids, liked_song_ids, 0, None, 0.0)
+    assert len(snapshot.mood_rows) == 4
+
+def test_liked_songs_load(benchmark, valora_app, bench_workdir):
+    ids = benchmark(catalog.load_liked_song_ids, str(bench_workdir / 'Liked_Songs_Spotify.csv'))
+    assert ids
+
+def test_mood_filter(benchmark, valora_app):
+    snapshot = valora_app.catalog.current()
+    track_ids = benchmark(snapshot.mood_track_ids, 'Happy/Energetic')
+    assert len(track_ids)
+
+def test_liked_membership_sets(benchmark, valora_app, bench_workdir):
+    # The old per-request path: copy the id set, then isin() over the whole bucket
+    liked_song_ids = catalog.load_liked_song_ids(str(bench_workdir / 'Liked_Songs_Spotify.csv'))
+    df = pd.read_csv(str(bench_workdir / 'valora_database.csv'), usecols=['track_id', 'app_mood'])
+    mood_songs = df[df['app_mood'] == 'Calm/Peaceful']
+    saved_track_ids = synthetic.make_track_ids(50, seed=3)
+
+    def positions():
+        user_liked_ids = liked_song_ids.copy()
+        user_liked_ids.update(saved_track_ids)
+        return mood_songs['track_id'].isin(user_liked_ids).to_numpy().nonzero()[0]
+
+    assert len(benchmark(positions))
+
+def test_liked_membership_rows(benchmark, valora_app):
+    # Same answer from uint32 row sets: merge the live saves, then index by row
+    snapshot = valora_app.catalog.current()
+    saved_track_ids = synthetic.make_track_ids(50, seed=3)
+
+    def positions():
+        return snapshot.liked_positions('Calm/Peaceful', snapshot.user_liked(saved_track_ids))
+
+    assert len(benchmark(positions))
+
+def test_pick_track_ids(benchmark, valora_app):
+    snapshot = valora_app.catalog.current()
+    bucket_track_ids = snapshot.mood_track_ids('Calm/Peaceful')
+
+    def pick():
+        liked_positions = snapshot.liked_positions('Calm/Peaceful', snapshot.liked)
+        return valora_app.pick_track_ids(bucket_track_ids, liked_positions)
+
+    track_ids, num_liked, num_general = benchmark(pick)
+    assert len(track_ids) == 20
+
+def test_pick_track_ids_weighted(benchmark, valora_app):
+    snapshot = valora_app.catalog.current()
+    bucket_track_ids = snapshot.mood_track_ids('Calm/Peaceful')
+    weights = snapshot.mood_weights['Calm/Peaceful']
+
+    def pick():
+        liked_positions = snapshot.liked_positions('Calm/Peaceful', snapshot.liked)
+        return valora_app.pick_track_ids(bucket_track_ids, liked_positions, weights=weights)
+
+    track_ids, num_liked, num_general = benchmark(pick)
+    assert len(set(track_ids)) == 20
+
+def test_pick_track_ids_personalized(benchmark, valora_app):
+    snapshot = valora_app.catalog.current()
+    bucket_track_ids = snapshot.mood_track_ids('Calm/Peaceful')
+    sampler = snapshot.mood_samplers['Calm/Peaceful']
+    saved_track_ids = synthetic.make_track_ids(50, seed=3)
+
+    def pick():
+        # Everything a request does per user: liked rows, bucket positions, boost overlay, draw
+        user_liked = snapshot.user_liked(saved_track_ids)
+        liked_positions = snapshot.liked_positions('Calm/Peaceful', user_liked)
+        overlay = snapshot.user_overlay('Calm/Peaceful', user_liked, liked_positions)
+        return valora_app.pick_track_ids(bucket_track_ids, liked_positions, weights=sampler, overlay=overlay)
+
+    track_ids, num_liked, num_general = benchmark(pick)
+    assert len(set(track_ids)) == 20
+
+def test_quadrant_mood_labeling(benchmark):
+    features = synthetic.make_features(20000)
+    moods = benchmark(features.apply, dataprocessing.get_quadrant_mood, axis=1)
+    assert moods.notna().all()
+
+def test_super_genre_labeling(benchmark):
+    features = synthetic.make_features(20000)
+    genres = benchmark(features['track_genre'].apply, dataprocessing.create_super_genre)
+    assert genres.notna().all()
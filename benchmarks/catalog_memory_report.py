@@ -0,0 +1,158 @@
+# In benchmarks/catalog_memory_report.py
+"""
+Compares the catalog frame as the app used to load it (plain read_csv,
+object string columns, only app_mood categorical) with the typed layout
+from catalog_schema.py.
+
+Each layout is loaded in a fresh interpreter so neither sees the
+other's memory. For both it reports load time, how much RSS the loaded
+catalog keeps, the in-memory size of every column, and how long it
+takes to find the catalog rows for a playlist's worth of track ids.
+
+    python benchmarks/catalog_memory_report.py --catalog-size 90000 --json catalog_memory.json
+    python benchmarks/catalog_memory_report.py --database valora_database.csv
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import synthetic
+from catalog_schema import ID_DTYPE
+
+LAYOUTS = ('legacy', 'schema')
+LOOKUP_IDS = 20
+LOOKUP_ROUNDS = 200
+
+def current_rss_mb():
+    # Current (not peak) RSS: a child's ru_maxrss starts at its parent's peak on Linux
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2**20
+    except Exception:
+        return None
+
+def load_legacy(path):
+    # What catalog.load_database did before catalog_schema.py
+    import pandas as pd
+    df = pd.read_csv(path)
+    df['app_mood'] = df['app_mood'].astype('category')
+    for col in df.columns:
+        if col.startswith('mood_prob_'):
+            df[col] = df[col].astype('float16')
+    df['artist_simple'] = df['artists'].astype(str).str.lower().str.split(';').str[0].str.split(',').str[0]
+    track_rows = pd.Index(df['track_id'])  # The id -> row index the old snapshot built
+    return df, track_rows
+
+def measure(layout, path):
+    """Runs in the child interpreter; returns this layout's numbers."""
+    import time
+
+    import numpy as np
+
+    import catalog_schema
+
+    rss_before = current_rss_mb()
+    t0 = time.perf_counter()
+    if layout == 'legacy':
+        df, track_rows = load_legacy(path)
+        track_ids = df['track_id'].to_numpy()
+    else:
+        df, track_ids = catalog_schema.read_catalog(path)
+        order = np.argsort(track_ids, kind='stable')
+        sorted_ids = track_ids[order]
+        extra_bytes = track_ids.nbytes + sorted_ids.nbytes + order.nbytes
+    load_s = time.perf_counter() - t0
+    rss_after = current_rss_mb()
+
+    rng = np.random.default_rng(0)
+    wanted = [t if isinstance(t, str) else t.decode('ascii')
+              for t in track_ids[rng.choice(len(track_ids), size=LOOKUP_IDS, replace=False)]]
+    t0 = time.perf_counter()
+    for _ in range(LOOKUP_ROUNDS):
+        if layout == 'legacy':
+            rows = track_rows.get_indexer(wanted)
+        else:
+            encoded = catalog_schema.encode_track_ids(wanted)
+            rows = order[np.searchsorted(sorted_ids, encoded)]
+    lookup_us = (time.perf_counter() - t0) / LOOKUP_ROUNDS * 1e6
+    assert len(rows) == LOOKUP_IDS
+    if layout == 'legacy':
+        extra_bytes = track_rows.memory_usage()  # The hash table (the id strings are counted in the column)
+
+    columns = {col: int(b) for col, b in df.memory_usage(deep=True, index=False).items()}
+    if layout == 'schema':
+        columns['track_id'] = int(track_ids.nbytes)
+    return {
+        'rows': len(df),
+        'load_s': load_s,
+        'rss_growth_mb': (rss_after - rss_before) if rss_before is not None else None,
+        'columns_bytes': columns,
+        'index_bytes': extra_bytes,
+        'total_mb': (sum(columns.values()) + extra_bytes) / 2**20,
+        'dtypes': {col: str(dtype) for col, dtype in df.dtypes.items()},
+        'lookup_us': lookup_us,
+    }
+
+def run_layout(layout, path):
+    proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', layout, '--database', path],
+                          capture_output=True, text=True, timeout=600)
+    line = next((l for l in proc.stdout.splitlines() if l.startswith('LAYOUT ')), None)
+    if line is None:
+        raise RuntimeError(f"{layout} load failed:\n{proc.stdout}\n{proc.stderr[-2000:]}")
+    return json.loads(line[len('LAYOUT '):])
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare catalog memory and latency: legacy frame vs catalog_schema.")
+    parser.add_argument('--catalog-size', type=int, default=90000)
+    parser.add_argument('--database', help="Use this valora_database.csv instead of a synthetic one")
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this JSON file")
+    parser.add_argument('--child', choices=LAYOUTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print('LAYOUT ' + json.dumps(measure(args.child, args.database)))
+        return
+
+    path = args.database
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(prefix='valora-catalog-'), 'valora_database.csv')
+        synthetic.write_catalog(path, n=args.catalog_size)
+    path = os.path.abspath(path)
+
+    report = {layout: run_layout(layout, path) for layout in LAYOUTS}
+    legacy, schema = report['legacy'], report['schema']
+
+    print(f"\n--- Catalog layout ({schema['rows']} tracks, {path}) ---")
+    print(f"{'':<28}{'legacy':>14}{'schema':>14}")
+    print(f"{'load time (s)':<28}{legacy['load_s']:>14.3f}{schema['load_s']:>14.3f}")
+    if legacy['rss_growth_mb'] is not None:
+        print(f"{'RSS growth (MB)':<28}{legacy['rss_growth_mb']:>14.1f}{schema['rss_growth_mb']:>14.1f}")
+    print(f"{'frame + id index (MB)':<28}{legacy['total_mb']:>14.1f}{schema['total_mb']:>14.1f}")
+    print(f"{f'row lookup, {LOOKUP_IDS} ids (us)':<28}{legacy['lookup_us']:>14.1f}{schema['lookup_us']:>14.1f}")
+    print("\nPer column (MB, dtype):")
+    for col in legacy['columns_bytes']:
+        old = legacy['columns_bytes'][col] / 2**20
+        new = schema['columns_bytes'].get(col, 0) / 2**20
+        dtype = schema['dtypes'].get(col, ID_DTYPE)
+        print(f"  {col:<26}{old:>14.2f}{new:>14.2f}   {dtype}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+# In benchmarks/conftest.py
+import os
+import sys
+
+import pytest
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+import synthetic
+
+CATALOG_SIZE = int(os.environ.get('VALORA_BENCH_CATALOG_SIZE', 90000))
+
+@pytest.fixture(scope='session')
+def bench_workdir(tmp_path_factory):
+    """A folder holding a synthetic valora_database.csv and Liked_Songs_Spotify.csv."""
+    workdir = tmp_path_factory.mktemp('valora')
+    catalog = synthetic.write_catalog(str(workdir / 'valora_database.csv'), n=CATALOG_SIZE)
+    synthetic.write_liked_songs(str(workdir / 'Liked_Songs_Spotify.csv'), catalog)
+    return workdir
+
+@pytest.fixture(scope='session')
+def valora_app(bench_workdir):
+    """Imports app.py against the synthetic data (it loads its files at import time)."""
+    os.environ.setdefault('SPOTIFY_CLIENT_ID', 'bench-client')
+    os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'bench-secret')
+    old_cwd = os.getcwd()
+    os.chdir(bench_workdir)
+    try:
+        import app
+    finally:
+        os.chdir(old_cwd)
+    return app
@@ -0,0 +1,198 @@
+# In benchmarks/fake_spotify.py
+"""
+A tiny local stand-in for the Spotify Web API and accounts service.
+
+Serves just the endpoints Valora uses (token, me, me/tracks, tracks,
+playlists) with a configurable artificial latency, so the app can be
+load-tested without touching real Spotify. Point the app at it with:
+
+    SPOTIFY_API_URL=http://127.0.0.1:8900/v1
+    SPOTIFY_ACCOUNTS_URL=http://127.0.0.1:8900
+
+Run standalone:  python benchmarks/fake_spotify.py --port 8900 --latency-ms 80
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+def fake_track(track_id):
+    return {
+        'id': track_id,
+        'name': f"Track {track_id[:6]}",
+        'artists': [{'name': f"Artist {track_id[:3]}"}],
+        'album': {'images': [{'url': f"https://i.scdn.co/image/{track_id}"}]},
+        'preview_url': None,
+        'external_urls': {'spotify': f"https://open.spotify.com/track/{track_id}"},
+    }
+
+def route_name(path):
+    # Collapse ids so call counts group by endpoint ('/v1/playlists/{id}/items')
+    parts = path.rstrip('/').split('/')
+    for i in range(1, len(parts)):
+        if parts[i - 1] in ('users', 'playlists') and parts[i] != 'playlists':
+            parts[i] = '{id}'
+    return '/'.join(parts)
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _sleep(self):
+        server = self.server
+        delay = server.latency_ms + random.uniform(0, server.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        with server.stats_lock:
+            server.calls[self.command + ' ' + route_name(urlparse(self.path).path)] += 1
+
+    def _rate_limited(self):
+        # Simulates Spotify's rolling-window limit: answer 429 with Retry-After once over budget
+        server = self.server
+        if not server.rate_limit_per_s:
+            return False
+        with server.stats_lock:
+            now = time.monotonic()
+            server.window = [t for t in server.window if now - t < 1.0]
+            if len(server.window) < server.rate_limit_per_s:
+                server.window.append(now)
+                return False
+            server.calls['429'] += 1
+        body = json.dumps({'error': {'status': 429, 'message': 'API rate limit exceeded'}}).encode()
+        self.send_response(429)
+        self.send_header('Retry-After', str(server.retry_after_s))
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return True
+
+    def do_GET(self):
+        self._sleep()
+        if self._rate_limited():
+            return
+        url = urlparse(self.path)
+        path = url.path.rstrip('/')  # spotipy sends 'me/' with a trailing slash
+        query = parse_qs(url.query)
+
+        if path == '/v1/me':
+            return self._send_json({'id': 'bench-user', 'display_name': 'Bench User'})
+        if path == '/v1/me/tracks':
+            limit = int(query.get('limit', ['20'])[0])
+            ids = self.server.saved_track_ids[:limit]
+            return self._send_json({'items': [{'track': fake_track(tid)} for tid in ids], 'total': len(ids)})
+        if path == '/v1/tracks':
+            ids = query.get('ids', [''])[0].split(',')
+            if len(ids) > 50:
+                return self._send_json({'error': {'status': 400, 'message': 'Too many ids requested'}}, 400)
+            return self._send_json({'tracks': [fake_track(tid) if tid else None for tid in ids]})
+        if path == '/v1/me/playlists':
+            with self.server.stats_lock:
+                items = [{'id': pid, 'name': name} for pid, name in self.server.playlists.items()]
+            return self._send_json({'items': items[:50], 'total': len(items)})
+        return self._send_json({'error': {'status': 404, 'message': 'Not found'}}, 404)
+
+    def do_POST(self):
+        self._sleep()
+        path = urlparse(self.path).path.rstrip('/')
+        body = self._read_body()
+
+        if path == '/api/token':
+            return self._send_json({
+                'access_token': 'fake-' + uuid.uuid4().hex,
+                'token_type': 'Bearer',
+                'expires_in': 3600,
+                'refresh_token': 'fake-refresh',
+                'scope': 'user-library-read playlist-modify-public playlist-modify-private',
+            })
+        if path.startswith('/v1/users/') and path.endswith('/playlists'):
+            name = json.loads(body or b'{}').get('name', 'Untitled')
+            playlist_id = uuid.uuid4().hex[:22]
+            with self.server.stats_lock:
+                self.server.playlists[playlist_id] = name
+            return self._send_json({'id': playlist_id, 'name': name}, 201)
+        if path.startswith('/v1/playlists/') and path.endswith(('/tracks', '/items')):
+            return self._send_json({'snapshot_id': uuid.uuid4().hex}, 201)
+        return self._send_json({'error': {'status': 404, 'message': 'Not found'}}, 404)
+
+    def do_PUT(self):
+        self._sleep()
+        path = urlparse(self.path).path.rstrip('/')
+        self._read_body()
+        if path.startswith('/v1/playlists/') and path.endswith(('/tracks', '/items')):
+            return self._send_json({'snapshot_id': uuid.uuid4().hex})
+        return self._send_json({'error': {'status': 404, 'message': 'Not found'}}, 404)
+
+class FakeSpotifyServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0, latency_ms=0.0, jitter_ms=0.0, saved_track_ids=None,
+                 rate_limit_per_s=0, retry_after_s=1):
+        super().__init__((host, port), FakeSpotifyHandler)
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_per_s = rate_limit_per_s  # 0 = unlimited; applies to GET endpoints
+        self.retry_after_s = retry_after_s
+        self.window = []
+        self.saved_track_ids = list(saved_track_ids or [])
+        self.playlists = {}
+        self.stats_lock = threading.Lock()
+        self.calls = Counter()
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_url(self):
+        return self.base_url + '/v1'
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local fake Spotify API for benchmarking.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8900)
+    parser.add_argument('--latency-ms', type=float, default=50.0, help="Base latency added to every call")
+    parser.add_argument('--jitter-ms', type=float, default=20.0, help="Extra random latency (0..jitter)")
+    parser.add_argument('--rate-limit', type=int, default=0, help="GET calls per second before answering 429 (0 = off)")
+    parser.add_argument('--retry-after', type=int, default=1, help="Retry-After seconds sent with a 429")
+    args = parser.parse_args()
+
+    server = FakeSpotifyServer(args.host, args.port, args.latency_ms, args.jitter_ms,
+                               rate_limit_per_s=args.rate_limit, retry_after_s=args.retry_after)
+    print(f"Fake Spotify listening on {server.base_url} (latency {args.latency_ms}ms + 0-{args.jitter_ms}ms)")
+    print(f"  SPOTIFY_API_URL={server.api_url}")
+    print(f"  SPOTIFY_ACCOUNTS_URL={server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
@@ -0,0 +1,223 @@
+# In benchmarks/load_driver.py
+"""
+Load driver for the Valora web app.
+
+Hammers /get_recommendations and /add_all_to_playlist at a fixed
+concurrency and reports p50/p95/p99 latency and requests/sec.
+
+By default it boots everything in-process: a fake Spotify server
+(benchmarks/fake_spotify.py), a synthetic catalog in a temp folder and
+the Flask app on a free port. Use --base-url to drive an app you
+started yourself instead (it must already point at a fake Spotify,
+see SPOTIFY_API_URL / SPOTIFY_ACCOUNTS_URL in app.py).
+
+    python benchmarks/load_driver.py --concurrency 16 --requests 400 --latency-ms 80
+
+The pseudo-endpoint `get_recommendations_stream` asks for the NDJSON
+stream and records the time to the first rendered track instead of the
+time to the whole playlist.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_spotify import FakeSpotifyServer
+import synthetic
+
+MOODS = synthetic.MOODS
+
+def start_local_stack(catalog_size, latency_ms, jitter_ms, rate_limit=0):
+    """Starts fake Spotify + the Flask app in this process. Returns (base_url, fake_server, http_server)."""
+    workdir = tempfile.mkdtemp(prefix='valora-bench-')
+    catalog = synthetic.write_catalog(os.path.join(workdir, 'valora_database.csv'), n=catalog_size)
+    synthetic.write_liked_songs(os.path.join(workdir, 'Liked_Songs_Spotify.csv'), catalog)
+
+    fake = FakeSpotifyServer(latency_ms=latency_ms, jitter_ms=jitter_ms,
+                             saved_track_ids=list(catalog['track_id'].sample(50, random_state=1)),
+                             rate_limit_per_s=rate_limit)
+    fake.start()
+
+    os.environ.setdefault('SPOTIFY_CLIENT_ID', 'bench-client')
+    os.environ.setdefault('SPOTIFY_CLIENT_SECRET', 'bench-secret')
+    os.environ['SPOTIFY_API_URL'] = fake.api_url
+    os.environ['SPOTIFY_ACCOUNTS_URL'] = fake.base_url
+
+    # app.py reads its data files relative to the working directory
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_DIR)
+    import app as valora_app
+    from werkzeug.serving import make_server
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+    http_server = make_server('127.0.0.1', 0, valora_app.app, threaded=True)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{http_server.server_port}", fake, http_server
+
+def wait_until_ready(base_url, timeout=120):
+    # In fast-start mode the catalog loads in the background; don't measure that
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/readyz").status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"App at {base_url} did not become ready within {timeout}s")
+
+def login(session, base_url):
+    # The fake token endpoint accepts any code, so /callback logs us straight in
+    resp = session.get(f"{base_url}/callback", params={'code': 'bench'}, allow_redirects=False)
+    if resp.status_code not in (301, 302, 303):
+        raise RuntimeError(f"Login failed with status {resp.status_code}")
+
+def time_to_first_track(session, base_url, payload):
+    """Streams one playlist; returns (ok, seconds until the first track line arrived)."""
+    start = time.perf_counter()
+    resp = session.post(f"{base_url}/get_recommendations?stream=1", json=payload, stream=True)
+    if resp.status_code != 200:
+        return False, time.perf_counter() - start
+    first_track_s, ok = None, False
+    for line in resp.iter_lines():
+        if not line:
+            continue
+        event = json.loads(line)
+        if event.get('type') == 'tracks' and first_track_s is None:
+            first_track_s = time.perf_counter() - start
+        ok = event.get('type') == 'done'
+    return ok, first_track_s if first_track_s is not None else time.perf_counter() - start
+
+def run_worker(worker_id, base_url, n_requests, endpoints, results, lock):
+    session = requests.Session()
+    login(session, base_url)
+    last_ids = []
+    for i in range(n_requests):
+        endpoint = endpoints[(worker_id + i) % len(endpoints)]
+        mood = MOODS[(worker_id + i) % len(MOODS)]
+        if endpoint == 'add_all_to_playlist' and not last_ids:
+            endpoint = 'get_recommendations'
+
+        if endpoint in ('get_recommendations', 'get_recommendations_stream'):
+            payload = {'mood': mood}
+        elif endpoint == 'get_recommendations_batch':
+            payload = {'moods': MOODS}  # The questionnaire's four playlists in one call
+        else:
+            payload = {'mood': mood, 'track_ids': last_ids}
+
+        start = time.perf_counter()
+        first_track_s = None
+        try:
+            if endpoint == 'get_recommendations_stream':
+                ok, first_track_s = time_to_first_track(session, base_url, payload)
+            else:
+                resp = session.post(f"{base_url}/{endpoint}", json=payload)
+                ok = resp.status_code == 200
+                if ok and endpoint == 'get_recommendations':
+                    last_ids = [song['id'] for song in resp.json().get('recommendations', [])]
+                elif ok and endpoint == 'get_recommendations_batch':
+                    playlists = resp.json().get('playlists', [])
+                    ok = len(playlists) == len(MOODS)
+                    last_ids = [song['id'] for song in playlists[0]['recommendations']] if playlists else last_ids
+        except requests.RequestException:
+            ok = False
+        elapsed = first_track_s if first_track_s is not None else time.perf_counter() - start
+
+        with lock:
+            results.setdefault(endpoint, {'latencies': [], 'errors': 0})
+            results[endpoint]['latencies'].append(elapsed)
+            if not ok:
+                results[endpoint]['errors'] += 1
+
+def summarize(results, wall_time):
+    report = {'wall_time_s': round(wall_time, 3), 'endpoints': {}}
+    total = 0
+    for endpoint, data in results.items():
+        lat_ms = np.array(data['latencies']) * 1000
+        total += len(lat_ms)
+        report['endpoints'][endpoint] = {
+            'requests': int(len(lat_ms)),
+            'errors': data['errors'],
+            'p50_ms': round(float(np.percentile(lat_ms, 50)), 2),
+            'p95_ms': round(float(np.percentile(lat_ms, 95)), 2),
+            'p99_ms': round(float(np.percentile(lat_ms, 99)), 2),
+            'rps': round(len(lat_ms) / wall_time, 2),
+        }
+    report['total_requests'] = total
+    report['total_rps'] = round(total / wall_time, 2) if wall_time else 0.0
+    return report
+
+def print_report(report):
+    print(f"\n{'endpoint':<24}{'reqs':>7}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>9}")
+    for endpoint, row in report['endpoints'].items():
+        print(f"{endpoint:<24}{row['requests']:>7}{row['errors']:>6}{row['p50_ms']:>10}"
+              f"{row['p95_ms']:>10}{row['p99_ms']:>10}{row['rps']:>9}")
+    print(f"\nTotal: {report['total_requests']} requests in {report['wall_time_s']}s "
+          f"({report['total_rps']} req/s)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test Valora against a fake Spotify.")
+    parser.add_argument('--base-url', help="Drive an already-running app instead of booting one")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="Total requests across all workers")
+    parser.add_argument('--endpoints', default='get_recommendations,add_all_to_playlist',
+                        help="Comma-separated endpoints to cycle through")
+    parser.add_argument('--catalog-size', type=int, default=90000)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--jitter-ms', type=float, default=20.0)
+    parser.add_argument('--rate-limit', type=int, default=0, help="Fake Spotify GET calls/sec before it answers 429")
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)  # start_local_stack changes directory
+
+    fake = http_server = None
+    base_url = args.base_url
+    if not base_url:
+        base_url, fake, http_server = start_local_stack(args.catalog_size, args.latency_ms, args.jitter_ms, args.rate_limit)
+        print(f"Booted app at {base_url} against fake Spotify at {fake.base_url}")
+
+    wait_until_ready(base_url)
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    per_worker = [args.requests // args.concurrency + (1 if i < args.requests % args.concurrency else 0)
+                  for i in range(args.concurrency)]
+    results, lock = {}, threading.Lock()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [pool.submit(run_worker, i, base_url, n, endpoints, results, lock)
+                   for i, n in enumerate(per_worker) if n]
+        for future in futures:
+            future.result()
+    wall_time = time.perf_counter() - start
+
+    report = summarize(results, wall_time)
+    report['config'] = {k: v for k, v in vars(args).items() if k != 'json_path'}
+    if fake:
+        report['spotify_calls'] = dict(fake.calls)
+    print_report(report)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json_path}")
+
+    if http_server:
+        http_server.shutdown()
+    if fake:
+        fake.stop()
+
+if __name__ == '__main__':
+    main()
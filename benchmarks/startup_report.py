@@ -0,0 +1,102 @@
+# In benchmarks/startup_report.py
+"""
+Measures app startup cost in eager and fast-start mode.
+
+For each mode it imports app.py in a fresh interpreter (against a
+synthetic catalog) and reports how long until the server could bind,
+how long until /readyz would pass, and the heaviest imports according
+to `python -X importtime`.
+
+    python benchmarks/startup_report.py --catalog-size 90000 --json startup.json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import synthetic
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import app
+bind_s = time.perf_counter() - t0
+app.catalog.ready.wait(120)
+ready_s = time.perf_counter() - t0
+# The catalog turns ready before load_app_data() finishes filling startup_info
+while app.startup_info.get('ready_s') is None and time.perf_counter() - t0 < 120:
+    time.sleep(0.01)
+print('STARTUP ' + json.dumps({{'bind_s': bind_s, 'ready_s': ready_s, 'startup': app.startup_info}}))
+"""
+
+def parse_importtime(stderr, top):
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+        except ValueError:
+            continue
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        # Keep top-level imports and what app.py imports directly; deeper ones are counted in their parent
+        if depth > 1 or name.strip() == 'app':
+            continue
+        totals[name.strip()] = max(totals.get(name.strip(), 0.0), int(cumulative) / 1e6)
+    return sorted(totals.items(), key=lambda kv: kv[1], reverse=True)[:top]
+
+def measure(mode, workdir, top):
+    env = dict(os.environ)
+    env.setdefault('SPOTIFY_CLIENT_ID', 'bench-client')
+    env.setdefault('SPOTIFY_CLIENT_SECRET', 'bench-secret')
+    env['VALORA_FAST_START'] = '1' if mode == 'fast' else '0'
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', PROBE.format(repo=REPO_DIR)],
+                          cwd=workdir, env=env, capture_output=True, text=True, timeout=300)
+    line = next((l for l in proc.stdout.splitlines() if l.startswith('STARTUP ')), None)
+    if line is None:
+        raise RuntimeError(f"{mode} start failed:\n{proc.stdout}\n{proc.stderr[-2000:]}")
+    result = json.loads(line[len('STARTUP '):])
+    result['heaviest_imports'] = parse_importtime(proc.stderr, top)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Report Valora startup and import cost.")
+    parser.add_argument('--catalog-size', type=int, default=90000)
+    parser.add_argument('--top', type=int, default=8, help="How many heavy imports to list")
+    parser.add_argument('--json', dest='json_path', help="Also write the report to this JSON file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='valora-startup-')
+    catalog = synthetic.write_catalog(os.path.join(workdir, 'valora_database.csv'), n=args.catalog_size)
+    synthetic.write_liked_songs(os.path.join(workdir, 'Liked_Songs_Spotify.csv'), catalog)
+
+    report = {}
+    for mode in ('eager', 'fast'):
+        result = measure(mode, workdir, args.top)
+        report[mode] = result
+        print(f"\n--- {mode} start ({args.catalog_size} tracks) ---")
+        print(f"Ready to bind after: {result['bind_s']:.3f}s")
+        print(f"Ready to serve after: {result['ready_s']:.3f}s")
+        startup = result['startup']
+        print(f"App's own timings ({startup['mode']} start): import {startup['import_s']}s, "
+              f"catalog load {startup['catalog_load_s']}s, spotipy import {startup['spotipy_import_s']}s, "
+              f"ready {startup['ready_s']}s")
+        print("Heaviest imports while importing app.py (cumulative s):")
+        for name, secs in result['heaviest_imports']:
+            print(f"  {name:<28}{secs:>8.3f}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.json_path}")
+
+if __name__ == '__main__':
+    main()
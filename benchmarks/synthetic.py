@@ -0,0 +1,72 @@
+# In benchmarks/synthetic.py
+"""
+Synthetic stand-ins for the files the app normally reads
+(valora_database.csv and Liked_Songs_Spotify.csv), so the benchmarks
+can run on any machine without the real datasets.
+"""
+import numpy as np
+import pandas as pd
+
+MOODS = ['Happy/Energetic', 'Calm/Peaceful', 'Angry/Tense', 'Sad/Melancholy']
+SUPER_GENRES = [
+    'Rock/Alternative', 'Electronic/Dance', 'Pop/R&B/Soul', 'Hip-Hop',
+    'Jazz/Blues/Reggae', 'Classical/Acoustic', 'Metal', 'Other'
+]
+ID_ALPHABET = np.array(list('0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz'))
+
+def make_track_ids(n, seed=0):
+    # Spotify track ids are 22 base-62 characters
+    rng = np.random.default_rng(seed)
+    chars = ID_ALPHABET[rng.integers(0, len(ID_ALPHABET), size=(n, 22))]
+    return [''.join(row) for row in chars]
+
+def mood_probability_column(mood):
+    # Same naming as catalog_schema.mood_probability_column
+    return 'mood_prob_' + mood.lower().replace('/', '_').replace(' ', '_')
+
+def make_catalog(n=90000, seed=0, mood_probabilities=True):
+    """
+    Builds a DataFrame with the same columns as valora_database.csv
+    (including the --mood-probabilities columns unless turned off).
+    """
+    rng = np.random.default_rng(seed)
+    n_artists = max(1, n // 8)
+    artist_ids = rng.integers(0, n_artists, size=n)
+    featured = rng.random(n) < 0.15
+    artists = [
+        f"Artist {a};Artist {(a * 7) % n_artists}" if feat else f"Artist {a}"
+        for a, feat in zip(artist_ids, featured)
+    ]
+    df = pd.DataFrame({
+        'track_id': make_track_ids(n, seed),
+        'track_name': [f"Track {i}" for i in range(n)],
+        'artists': artists,
+        'app_mood': rng.choice(MOODS, size=n),
+        'super_genre': rng.choice(SUPER_GENRES, size=n),
+    })
+    if mood_probabilities:
+        probs = rng.dirichlet(np.ones(len(MOODS)), size=n).astype(np.float16)
+        for i, mood in enumerate(MOODS):
+            df[mood_probability_column(mood)] = probs[:, i]
+    return df
+
+def make_features(n=90000, seed=0):
+    """Builds raw audio-feature rows like combined_processed.csv (for the labeling benchmarks)."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'valence': rng.random(n),
+        'energy': rng.random(n),
+        'track_genre': rng.choice(['indie-rock', 'house', 'k-pop', 'hip-hop', 'jazz', 'piano', 'metal', 'folk'], size=n),
+    })
+
+def write_catalog(path, n=90000, seed=0):
+    df = make_catalog(n, seed)
+    df.to_csv(path, index=False)
+    return df
+
+def write_liked_songs(path, catalog, n=500, seed=0):
+    # Liked_Songs_Spotify.csv only needs the 'Track URI' column for the app
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(catalog), size=min(n, len(catalog)), replace=False)
+    uris = [f"spotify:track:{tid}" for tid in catalog['track_id'].iloc[picks]]
+    pd.DataFrame({'Track URI': uris}).to_csv(path, index=False)
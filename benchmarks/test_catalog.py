@@ -0,0 +1,18 @@
+# In benchmarks/test_catalog.py
+import numpy as np
+
+from catalog import CONFIDENCE_FLOOR, confidence_weights
+from weighted_sampling import CumulativeWeights
+
+def test_zero_confidence_tracks_stay_drawable():
+    probs = np.array([0.0] * 25 + [0.9] * 5)
+    weights = confidence_weights(probs)
+    assert weights.min() == CONFIDENCE_FLOOR * probs.mean()
+    assert (weights[25:] == 0.9).all()
+    picks = CumulativeWeights(weights).draw(20, rng=np.random.default_rng(0))
+    assert len(set(picks)) == 20
+
+def test_confidence_floor_keeps_missing_and_all_zero_buckets_usable():
+    weights = confidence_weights(np.array([np.nan, 0.0, 0.5]))
+    assert np.isnan(weights[0]) and weights[1] > 0
+    assert (confidence_weights(np.zeros(4)) == CONFIDENCE_FLOOR).all()
@@ -0,0 +1,103 @@
+# In benchmarks/test_recommendations.py
+"""Behaviour checks for the request-side helpers in app.py (run against the synthetic catalog)."""
+import json
+
+import numpy as np
+
+import fake_spotify
+from catalog_schema import decode_track_ids, encode_track_ids
+from metadata_store import track_to_metadata
+from weighted_sampling import CumulativeWeights
+
+def test_pick_track_ids_counts_what_was_drawn(valora_app):
+    # Only 5 of 30 tracks can be drawn: the counts must describe the 5, not the 20 asked for
+    track_ids = encode_track_ids([f"{i:022d}" for i in range(30)])
+    weights = CumulativeWeights(np.array([0.0] * 25 + [1.0] * 5))
+    picked, num_liked, num_general = valora_app.pick_track_ids(track_ids, np.empty(0, dtype=np.int64),
+                                                                weights=weights)
+    assert len(picked) == 5
+    assert (num_liked, num_general) == (0, 5)
+
+def test_allocate_playlist_sizes_largest_remainder(valora_app):
+    assert valora_app.allocate_playlist_sizes({'a': 5, 'b': 3, 'c': 2}, 20) == {'a': 10, 'b': 6, 'c': 4}
+    # 7 * (0.5, 0.3, 0.2) = 3.5, 2.1, 1.4: the one leftover song goes to the largest remainder
+    assert valora_app.allocate_playlist_sizes({'a': 5, 'b': 3, 'c': 2}, 7) == {'a': 4, 'b': 2, 'c': 1}
+    # Equal remainders: the leftover goes to the first mood given
+    assert valora_app.allocate_playlist_sizes({'a': 1, 'b': 1, 'c': 1}, 10) == {'a': 4, 'b': 3, 'c': 3}
+    assert valora_app.allocate_playlist_sizes({'a': 0.7, 'b': 0.3, 'c': 0.0}, 20) == {'a': 14, 'b': 6, 'c': 0}
+
+def test_allocate_playlist_sizes_huge_weights(valora_app):
+    assert valora_app.allocate_playlist_sizes({'a': 1e308, 'b': 1e308}, 20) == {'a': 10, 'b': 10}
+
+def test_parse_batch_request_lists(valora_app):
+    parse = valora_app.parse_batch_request
+    assert parse({'moods': ['Happy/Energetic', 'Calm/Peaceful', 'Happy/Energetic'], 'total': 10}) == (
+        {'Happy/Energetic': 10, 'Calm/Peaceful': 10}, None)
+    sizes, error = parse({'moods': [f'mood {i}' for i in range(9)], 'total': 1})
+    assert sizes is None and 'At most 8 moods' in error
+    sizes, error = parse({'moods': ['a', 'b', 'c'], 'total': 34})
+    assert sizes is None and 'At most 100 songs' in error
+    assert parse({'moods': ['a'], 'total': 101})[0] is None
+    assert parse({'moods': ['a'], 'total': True})[0] is None
+
+def test_parse_batch_request_weights(valora_app):
+    parse = valora_app.parse_batch_request
+    assert parse({'moods': {'a': 3, 'b': 1}, 'total': 8}) == ({'a': 6, 'b': 2}, None)
+    assert parse({'moods': {'a': 1e308, 'b': 1e308}, 'total': 20}) == ({'a': 10, 'b': 10}, None)
+    sizes, error = parse({'moods': {'a': 0, 'b': 0}})
+    assert sizes is None and 'positive' in error
+    for bad in (-1, float('inf'), float('nan'), 10**400, True, '1'):
+        sizes, error = parse({'moods': {'a': bad}})
+        assert sizes is None and 'non-negative number' in error
+    sizes, error = parse({'moods': {f'mood {i}': 1 for i in range(9)}})
+    assert sizes is None and 'At most 8 moods' in error
+
+def test_parse_batch_request_non_object_bodies(valora_app):
+    for body in ([1], 'x', 3, None, {}, {'moods': []}, {'moods': ['']}):
+        sizes, error = valora_app.parse_batch_request(body)
+        assert sizes is None and error.startswith('Moods not provided')
+
+def test_reload_catalog_checks_admin_token(valora_app, monkeypatch):
+    reloads = []
+    monkeypatch.setattr(valora_app, 'ADMIN_TOKEN', 'secret-token')
+    monkeypatch.setattr(valora_app.catalog, 'reload', lambda reason: reloads.append(reason))
+    client = valora_app.app.test_client()
+
+    assert client.post('/admin/reload_catalog').status_code == 403
+    assert client.post('/admin/reload_catalog', headers={'X-Admin-Token': 'secret-tokeN'}).status_code == 403
+    response = client.post('/admin/reload_catalog', headers={'X-Admin-Token': 'secret-token'})
+    assert response.status_code == 202
+    assert response.get_json()['scope'].startswith('this worker only')
+    assert reloads == ['admin endpoint']
+
+def test_stream_recommendations_event_order(valora_app, monkeypatch):
+    snapshot = valora_app.catalog.current()
+    ids = decode_track_ids(snapshot.mood_track_ids('Calm/Peaceful')[:4])
+    # The same track twice, as a duplicate in the catalog can produce
+    track_ids = [ids[0], ids[1], ids[2], ids[0], ids[3]]
+
+    def metadata(track_id):
+        return track_to_metadata(fake_spotify.fake_track(track_id))
+
+    def fake_metadata(wanted):
+        # Two batches resolve (one carrying an id nobody asked for); ids[3] never does
+        yield {ids[1]: metadata(ids[1]), 'not-requested': metadata('x' * 22)}
+        yield {ids[0]: metadata(ids[0]), ids[2]: metadata(ids[2])}
+
+    monkeypatch.setattr(valora_app, 'get_spotify_client', lambda: (object(), False))
+    monkeypatch.setattr(valora_app, 'fetch_user_liked', lambda sp_user, snapshot: snapshot.liked)
+    monkeypatch.setattr(valora_app, 'recommend_for_mood', lambda *args, **kwargs: (track_ids, 'Here you go'))
+    monkeypatch.setattr(valora_app, 'iter_track_metadata', fake_metadata)
+
+    response = valora_app.app.test_client().post('/get_recommendations', json={'mood': 'Calm/Peaceful'},
+                                                  headers={'Accept': valora_app.NDJSON_MIMETYPE})
+    assert response.mimetype == valora_app.NDJSON_MIMETYPE
+    events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+    assert [e['type'] for e in events] == ['start', 'tracks', 'tracks', 'tracks', 'done']
+    assert events[0] == {'type': 'start', 'message': 'Here you go', 'ids': track_ids}
+    assert [(item['index'], item['id']) for item in events[1]['items']] == [(1, ids[1])]
+    assert sorted((item['index'], item['id']) for item in events[2]['items']) == [(0, ids[0]), (2, ids[2]), (3, ids[0])]
+    # Never resolved: filled in from the catalog, at its own index
+    assert [(item['index'], item['id']) for item in events[3]['items']] == [(4, ids[3])]
+    assert events[4] == {'type': 'done', 'resolved': 3, 'fallback': 1}
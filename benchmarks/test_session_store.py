@@ -0,0 +1,85 @@
+# In benchmarks/test_session_store.py
+import pytest
+from flask import Flask, session
+
+from session_store import MemorySessionStore, ServerSideSessionInterface, SessionStore, SQLiteSessionStore
+
+@pytest.fixture
+def store():
+    return MemorySessionStore()
+
+@pytest.fixture
+def client(store):
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    app.session_interface = ServerSideSessionInterface(store)
+
+    @app.route('/visit')
+    def visit():
+        session['visited'] = True
+        return ''
+
+    @app.route('/login')
+    def login():
+        # Same shape as app.py's callback: clear, then store the new login
+        session.clear()
+        session['token_info'] = {'access_token': 'fresh'}
+        return ''
+
+    @app.route('/static-page')
+    def static_page():
+        return 'same for everyone'
+
+    @app.route('/whoami')
+    def whoami():
+        return session.get('token_info', {}).get('access_token', '')
+
+    return app.test_client()
+
+def sid_cookie(client):
+    return client.get_cookie('session').value
+
+def test_login_after_clear_issues_new_sid(client, store):
+    client.get('/visit')
+    old_sid = sid_cookie(client)
+
+    client.get('/login')
+    new_sid = sid_cookie(client)
+
+    assert new_sid != old_sid
+    assert store.load(old_sid, 0) is None
+    assert client.get('/whoami').get_data(as_text=True) == 'fresh'
+
+def test_planted_sid_does_not_see_login(client, store):
+    client.get('/visit')
+    planted_sid = sid_cookie(client)
+    client.get('/login')
+
+    client.set_cookie('session', planted_sid)
+    assert client.get('/whoami').get_data(as_text=True) == ''
+
+def test_session_reads_add_vary_cookie(client):
+    # Logged out: the session is read and stays empty, which is the early-return path
+    assert 'Cookie' in client.get('/whoami').vary
+    client.get('/login')
+    assert 'Cookie' in client.get('/whoami').vary
+    assert 'Cookie' in client.get('/visit').vary
+
+def test_untouched_session_has_no_vary(client):
+    assert 'Cookie' not in client.get('/static-page').vary
+
+@pytest.mark.parametrize('backend', ['memory', 'sqlite'])
+def test_stores_implement_session_store(backend, tmp_path):
+    store = MemorySessionStore() if backend == 'memory' else SQLiteSessionStore(str(tmp_path / 'sessions.db'))
+    assert isinstance(store, SessionStore)
+    store.save('a', '{}', 10.0)
+    store.save('b', '{}', 100.0)
+    store.touch('a', 50.0)
+    assert tuple(store.load('a', 20.0)) == ('{}', 50.0)
+    assert store.sweep(60.0) == 1
+    store.delete('b')
+    assert store.load('b', 0.0) is None
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore()
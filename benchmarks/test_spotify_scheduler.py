@@ -0,0 +1,46 @@
+# In benchmarks/test_spotify_scheduler.py
+import time
+
+import pytest
+
+import synthetic
+from fake_spotify import FakeSpotifyServer
+from metadata_store import spotify_client_from_env
+from spotify_scheduler import SCHEDULER_CLIENT_KWARGS, SpotifyScheduler, TokenBucket
+
+@pytest.fixture
+def rate_limited_spotify(monkeypatch, tmp_path):
+    """A fake Spotify that answers the second GET within a second with 429, Retry-After: 7."""
+    fake = FakeSpotifyServer(rate_limit_per_s=1, retry_after_s=7).start()
+    monkeypatch.chdir(tmp_path)  # spotipy caches the client token in ./.cache
+    monkeypatch.setenv('SPOTIFY_CLIENT_ID', 'test-client')
+    monkeypatch.setenv('SPOTIFY_CLIENT_SECRET', 'test-secret')
+    monkeypatch.setenv('SPOTIFY_API_URL', fake.api_url)
+    monkeypatch.setenv('SPOTIFY_ACCOUNTS_URL', fake.base_url)
+    yield fake
+    fake.stop()
+
+def test_rate_limit_pause_follows_retry_after(rate_limited_spotify):
+    scheduler = SpotifyScheduler(lambda: spotify_client_from_env(**SCHEDULER_CLIENT_KWARGS),
+                                 rate_per_s=100, burst=10, batch_size=1, workers=1)
+    pauses = []
+    pause = scheduler.bucket.pause
+    scheduler.bucket.pause = lambda seconds: (pauses.append(seconds), pause(seconds))
+
+    scheduler.submit(synthetic.make_track_ids(2, seed=1))
+    deadline = time.monotonic() + 5
+    while not pauses and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert pauses == [7.0]
+    assert scheduler.stats['rate_limited'] == 1
+    assert rate_limited_spotify.calls['429'] == 1
+
+def test_bucket_refills_from_end_of_pause():
+    bucket = TokenBucket(rate_per_s=20, burst=20)
+    bucket.pause(0.2)
+    t0 = time.monotonic()
+    for _ in range(3):
+        bucket.acquire()
+    # The first token is a refill interval after the pause, not a burst the moment it lifts
+    assert time.monotonic() - t0 >= 0.2 + 3 / 20 - 0.02
@@ -0,0 +1,43 @@
+# In benchmarks/test_weighted_sampling.py
+import numpy as np
+
+from weighted_sampling import BoostOverlay, CumulativeWeights
+
+DRAWS = 20000
+
+def frequencies(sampler, n, **kwargs):
+    rng = np.random.default_rng(7)
+    counts = np.zeros(n)
+    for _ in range(DRAWS):
+        counts[sampler.draw(1, rng=rng, **kwargs)] += 1
+    return counts / DRAWS
+
+def test_draw_follows_weights():
+    freq = frequencies(CumulativeWeights([1.0, 2.0, 3.0, 4.0]), 4)
+    np.testing.assert_allclose(freq, [0.1, 0.2, 0.3, 0.4], atol=0.015)
+
+def test_draw_adds_overlay_to_base_weights():
+    # Overlapping boosts add up: position 0 ends at 1 + 3 + 1 = 5, position 2 at 3 + 1 = 4
+    overlay = BoostOverlay().add([0], 3.0).add([0, 2], 1.0)
+    assert len(overlay) == 2
+    freq = frequencies(CumulativeWeights([1.0, 2.0, 3.0, 4.0]), 4, overlay=overlay)
+    np.testing.assert_allclose(freq, np.array([5, 2, 4, 4]) / 15, atol=0.015)
+
+def test_draw_with_exclusions_renormalises():
+    overlay = BoostOverlay().add([0], 4.0)
+    freq = frequencies(CumulativeWeights([1.0, 2.0, 3.0, 4.0]), 4, overlay=overlay, exclude=[3])
+    assert freq[3] == 0
+    np.testing.assert_allclose(freq[:3], np.array([5, 2, 3]) / 10, atol=0.015)
+
+def test_draw_without_replacement_and_exact_fallback():
+    sampler = CumulativeWeights(np.ones(50))
+    rng = np.random.default_rng(3)
+    picks = sampler.draw(50, rng=rng)
+    assert sorted(picks) == list(range(50))
+    # Almost everything excluded: rejection gives up and the exact draw finishes the job
+    picks = sampler.draw(5, exclude=range(48), rng=rng, overlay=BoostOverlay().add([0, 1], 10.0))
+    assert sorted(picks) == [48, 49]
+
+def test_top_skips_exclusions():
+    sampler = CumulativeWeights([0.2, 0.9, 0.5, 0.9])
+    assert sampler.top(3, exclude=[3]) == [1, 2, 0]
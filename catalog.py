@@ -0,0 +1,295 @@
+# In catalog.py
+"""
+Catalog manager for the web app.
+
+Holds the song database (valora_database.csv) and the liked songs as an
+immutable CatalogSnapshot. A new catalog is loaded and indexed in the
+background and then swapped in with a single reference assignment, so
+requests already in flight keep using the snapshot they started with
+and a catalog refresh never blocks a request.
+
+Reloads happen when the watcher sees the files change, on SIGHUP, or
+when CatalogManager.reload() is called (see /admin/reload_catalog).
+"""
+import os
+import signal
+import threading
+import time
+
+from catalog_schema import decode_track_ids, encode_track_ids, mood_probability_column, read_catalog
+from row_set import RowSet
+from weighted_sampling import BoostOverlay, CumulativeWeights
+
+# Mood-model confidence is floored at this share of the bucket's mean, so a track the
+# model scored ~0 for its own mood is rare in a weighted playlist rather than impossible
+CONFIDENCE_FLOOR = 0.1
+
+def confidence_weights(probabilities):
+    """Sampling weights for one bucket from its mood probabilities (NaN stays NaN)."""
+    import numpy as np
+    known = probabilities[~np.isnan(probabilities)]
+    mean = float(np.clip(known, 0.0, None).mean()) if len(known) else 0.0
+    floor = CONFIDENCE_FLOOR * (mean if mean > 0 else 1.0)
+    return np.where(np.isnan(probabilities), probabilities, np.maximum(probabilities, floor))
+
+def load_liked_song_ids(path):
+    import pandas as pd
+    df_liked = pd.read_csv(path)
+    return set(df_liked['Track URI'].str.split(':').str[2])
+
+def file_signature(path):
+    # (mtime, size) is enough to notice process_final_database.py writing a new file
+    try:
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+    except OSError:
+        return None
+
+class CatalogSnapshot:
+    """One loaded catalog and its indexes. Never mutated after it is built."""
+
+    def __init__(self, df, track_ids, liked_song_ids, version, signatures, build_s, use_mood_confidence=True):
+        import numpy as np
+
+        self.df = df
+        self.track_ids = track_ids  # Row-aligned 'S22' array (see catalog_schema)
+        self.version = version
+        self.signatures = signatures
+        self.build_s = build_s
+        self.loaded_at = time.time()
+
+        # Pre-split the catalog per mood so requests don't scan the whole frame
+        self.mood_rows = {
+            mood: rows for mood, rows in df.groupby('app_mood', observed=True, sort=False).indices.items()
+        }
+        self.mood_ids = {mood: track_ids[rows] for mood, rows in self.mood_rows.items()}
+
+        # Row -> (mood bucket, position inside it), and track id -> first row (binary search
+        # over the sorted ids), so a user's liked rows map to bucket positions without scanning
+        self.bucket_pos = np.full(len(df), -1, dtype=np.int64)
+        self.row_mood = np.full(len(df), -1, dtype=np.int16)
+        self._mood_index = {}
+        for i, (mood, rows) in enumerate(self.mood_rows.items()):
+            self.bucket_pos[rows] = np.arange(len(rows))
+            self.row_mood[rows] = i
+            self._mood_index[mood] = i
+        self._id_order = np.argsort(track_ids, kind='stable')  # Stable, so duplicates resolve to the first row
+        self._sorted_ids = track_ids[self._id_order]
+
+        # The liked-songs CSV as catalog rows; ids that aren't in the catalog can't be recommended anyway
+        self.liked = RowSet(self.track_row_positions(liked_song_ids))
+
+        # Artists as small ints, plus each bucket's positions grouped by artist, so
+        # "songs by artists this user likes" is a couple of binary searches
+        self.artist_codes = df['artist_simple'].cat.codes.to_numpy()
+        self._artist_index = {}
+        for mood, rows in self.mood_rows.items():
+            codes = self.artist_codes[rows]
+            order = np.argsort(codes, kind='stable')
+            self._artist_index[mood] = (codes[order], order)
+
+        # Cumulative mood-confidence weights per bucket, so requests can weight-sample
+        # without calling the model or re-normalising anything
+        self.mood_weights = {}
+        if use_mood_confidence:
+            for mood, rows in self.mood_rows.items():
+                col = mood_probability_column(mood)
+                if col in df.columns and len(rows):
+                    self.mood_weights[mood] = CumulativeWeights(confidence_weights(df[col].to_numpy(dtype='float64')[rows]))
+        # Every bucket gets a sampler (flat weights without confidence) so per-user
+        # boosts can be layered on top either way
+        self.mood_samplers = {
+            mood: self.mood_weights.get(mood) or CumulativeWeights(np.ones(len(rows)))
+            for mood, rows in self.mood_rows.items() if len(rows)
+        }
+
+        self.memory_bytes = int(df.memory_usage(deep=True).sum()) + track_ids.nbytes + self._sorted_ids.nbytes
+
+    def mood_track_ids(self, mood):
+        """The bucket's track ids ('S22'), in bucket position order."""
+        import numpy as np
+        return self.mood_ids.get(mood, np.empty(0, dtype=self.track_ids.dtype))
+
+    def track_row_positions(self, track_ids):
+        """Catalog row positions of the given ids, in order (unknown ids are dropped)."""
+        import numpy as np
+        wanted = encode_track_ids(track_ids)
+        if not len(wanted) or not len(self._sorted_ids):
+            return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self._sorted_ids, wanted)
+        pos[pos == len(self._sorted_ids)] = 0
+        found = self._sorted_ids[pos] == wanted
+        return self._id_order[pos[found]]
+
+    def songs_by_id(self, track_ids):
+        """Catalog rows for `track_ids` (one per distinct id), indexed by track id (str)."""
+        rows = self.track_row_positions(list(dict.fromkeys(track_ids)))
+        songs = self.df.iloc[rows]
+        songs.index = decode_track_ids(self.track_ids[rows])
+        return songs
+
+    def user_liked(self, saved_track_ids=()):
+        """The catalog-wide liked rows plus a user's saved tracks, as a new RowSet."""
+        return self.liked.union(self.track_row_positions(saved_track_ids))
+
+    def liked_positions(self, mood, liked):
+        """Sorted positions inside the `mood` bucket of the rows in `liked` (a RowSet)."""
+        import numpy as np
+        mood_index = self._mood_index.get(mood)
+        if mood_index is None:
+            return np.empty(0, dtype=np.int64)
+        rows = liked.rows[self.row_mood[liked.rows] == mood_index]
+        return self.bucket_pos[rows]  # Buckets keep catalog order, so these stay sorted
+
+    def user_overlay(self, mood, liked, liked_positions=None, liked_boost=2.0, artist_boost=1.0):
+        """
+        Per-user extra weight for the `mood` bucket: liked tracks get `liked_boost`
+        and tracks by artists the user likes get `artist_boost`, both in units of
+        the bucket's mean weight. Built from the liked rows only; the shared
+        sampler is left untouched.
+        """
+        import numpy as np
+        overlay = BoostOverlay()
+        sampler = self.mood_samplers.get(mood)
+        if sampler is None or not len(liked):
+            return overlay
+        unit = sampler.mean_weight()
+
+        if liked_positions is None:
+            liked_positions = self.liked_positions(mood, liked)
+        overlay.add(liked_positions, liked_boost * unit)
+
+        if artist_boost > 0:
+            sorted_codes, order = self._artist_index[mood]
+            artists = np.unique(self.artist_codes[liked.rows])
+            artists = artists[artists >= 0]  # Tracks with no artist don't share one
+            starts = np.searchsorted(sorted_codes, artists, side='left')
+            ends = np.searchsorted(sorted_codes, artists, side='right')
+            spans = [order[a:b] for a, b in zip(starts, ends) if b > a]
+            if spans:
+                overlay.add(np.concatenate(spans), artist_boost * unit)
+        return overlay
+
+    def info(self):
+        return {
+            'version': self.version,
+            'tracks': len(self.df),
+            'liked_songs': len(self.liked),
+            'liked_bytes': self.liked.nbytes,
+            'mood_weighted': sorted(self.mood_weights),
+            'artists': len(self.df['artist_simple'].cat.categories),
+            'memory_mb': round(self.memory_bytes / 2**20, 1),
+            'build_s': round(self.build_s, 4),
+            'loaded_at': self.loaded_at,
+        }
+
+class CatalogManager:
+    def __init__(self, database_file, liked_songs_file, use_mood_confidence=True):
+        self.database_file = database_file
+        self.liked_songs_file = liked_songs_file
+        self.use_mood_confidence = use_mood_confidence
+        self.ready = threading.Event()
+        self.error = None
+        self._snapshot = None
+        self._version = 0
+        self._reload_lock = threading.Lock()
+        self._watch_thread = None
+
+    def current(self):
+        """The snapshot to use for one request. Grab it once and keep using it."""
+        return self._snapshot
+
+    def _signatures(self):
+        return (file_signature(self.database_file), file_signature(self.liked_songs_file))
+
+    def _build(self):
+        t0 = time.perf_counter()
+        signatures = self._signatures()
+        print(f"Loading recommendation database: {self.database_file}...")
+        df, track_ids = read_catalog(self.database_file)
+        print(f"✅ Recommendation database loaded ({len(df)} tracks).")
+
+        try:
+            liked_song_ids = load_liked_song_ids(self.liked_songs_file)
+            print(f"✅ Loaded {len(liked_song_ids)} liked song IDs from CSV.")
+        except Exception:
+            print(f"Warning: '{self.liked_songs_file}' not found or invalid. Personalization will be limited.")
+            liked_song_ids = set()
+
+        return CatalogSnapshot(df, track_ids, liked_song_ids, self._version + 1, signatures, time.perf_counter() - t0,
+                               use_mood_confidence=self.use_mood_confidence)
+
+    def load(self):
+        """
+        Builds a new snapshot and swaps it in. Returns True on success.
+        If loading fails the previous snapshot (if any) stays in service.
+        """
+        with self._reload_lock:
+            try:
+                snapshot = self._build()
+            except FileNotFoundError:
+                print(f"🚨 FATAL ERROR: Could not find '{self.database_file}'.")
+                print("Please run 'process_final_database.py' first.")
+                self.error = f"Could not find '{self.database_file}'."
+                return False
+            except Exception as e:
+                print(f"🚨 ERROR: Could not load '{self.database_file}': {e}")
+                self.error = f"Could not load '{self.database_file}': {e}"
+                return False
+
+            self._version = snapshot.version
+            self._snapshot = snapshot  # Atomic swap; in-flight requests keep the old one
+            self.error = None
+            self.ready.set()
+            return True
+
+    def reload(self, reason='manual'):
+        """Reloads in a background thread so the caller (a request or signal handler) never waits."""
+        print(f"Catalog reload requested ({reason})...")
+        thread = threading.Thread(target=self._reload_and_report, name='valora-catalog-reload', daemon=True)
+        thread.start()
+        return thread
+
+    def _reload_and_report(self):
+        old_version = self._version
+        if self.load():
+            print(f"✅ Catalog swapped: version {old_version} -> {self._version}.")
+            return True
+        print(f"Catalog reload failed, still serving version {old_version}.")
+        return False
+
+    def start_watching(self, interval_s):
+        """Polls the data files and reloads once a change has settled for one interval."""
+        if self._watch_thread or interval_s <= 0:
+            return
+
+        def watch():
+            pending = failed = None
+            while True:
+                time.sleep(interval_s)
+                snapshot = self._snapshot
+                if snapshot is None:
+                    continue
+                signatures = self._signatures()
+                if signatures in (snapshot.signatures, failed) or signatures[0] is None:
+                    pending = None
+                elif signatures == pending:
+                    # Unchanged since the last poll, so the writer is done
+                    pending = None
+                    if not self._reload_and_report():
+                        failed = signatures  # Don't retry the same broken file every poll
+                else:
+                    pending = signatures
+
+        self._watch_thread = threading.Thread(target=watch, name='valora-catalog-watch', daemon=True)
+        self._watch_thread.start()
+        print(f"Watching '{self.database_file}' for changes every {interval_s}s.")
+
+    def install_signal_handler(self, signum=getattr(signal, 'SIGHUP', None)):
+        """Reload on SIGHUP. Only possible from the main thread, and not on Windows."""
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+        if signal.getsignal(signum) not in (signal.SIG_DFL, None):
+            return False  # Someone else (e.g. a process manager) owns this signal
+        signal.signal(signum, lambda *_: self.reload(reason='signal'))
+        return True
@@ -0,0 +1,121 @@
+# In catalog_schema.py
+"""
+Column layout and dtypes of valora_database.csv.
+
+process_final_database.py writes the catalog through apply_schema() and
+the app reads it back through read_catalog(), so both agree on what is
+in the file and how it is held in memory:
+
+- app_mood is a categorical with the four app moods as fixed categories,
+- super_genre, artists and artist_simple are dictionary-encoded (pandas
+  categoricals), so repeated strings are stored once; track_name is too
+  when enough names repeat for the dictionary to pay for itself,
+- mood_prob_* columns are float16,
+- track ids are kept out of the frame as a fixed-width bytes array
+  (numpy 'S22', 22 bytes per row), since a pandas string column would
+  hold one Python object per row.
+"""
+import numpy as np
+
+APP_MOODS = ['Happy/Energetic', 'Calm/Peaceful', 'Angry/Tense', 'Sad/Melancholy']
+
+# Spotify track ids are 22 base-62 characters
+ID_WIDTH = 22
+ID_DTYPE = f'S{ID_WIDTH}'
+ID_PATTERN = rf'[0-9A-Za-z]{{{ID_WIDTH}}}'
+
+CATALOG_COLUMNS = ['track_id', 'track_name', 'artists', 'app_mood', 'super_genre']
+DICTIONARY_COLUMNS = ['artists', 'super_genre']
+# A categorical costs its codes on top of the distinct strings, so it only saves
+# memory when a good share of the values repeat
+NAME_DICTIONARY_MAX_DISTINCT = 0.5
+
+# Per-class mood-model probabilities written by `process_final_database.py --mood-probabilities`
+MOOD_PROB_PREFIX = 'mood_prob_'
+PROBABILITY_DTYPE = 'float16'
+
+def mood_probability_column(mood):
+    # 'Happy/Energetic' -> 'mood_prob_happy_energetic'
+    return MOOD_PROB_PREFIX + mood.lower().replace('/', '_').replace(' ', '_')
+
+def probability_columns(columns):
+    return [c for c in columns if c.startswith(MOOD_PROB_PREFIX)]
+
+def valid_track_ids(ids):
+    """Bool mask of ids that fit ID_DTYPE exactly (anything else would be truncated)."""
+    return ids.astype('string').str.fullmatch(ID_PATTERN).fillna(False).to_numpy(dtype=bool)
+
+def encode_track_ids(track_ids):
+    """
+    Fixed-width bytes for an iterable of id strings. Ids that aren't
+    valid Spotify ids are dropped, so check the length of the result
+    if the caller needs positions to line up.
+    """
+    ids = [t for t in track_ids if isinstance(t, str) and len(t) == ID_WIDTH and t.isascii()]
+    return np.array(ids, dtype=ID_DTYPE)
+
+def decode_track_ids(encoded):
+    return [t.decode('ascii') for t in encoded]
+
+def _encode_names(names):
+    if len(names) and names.nunique() <= NAME_DICTIONARY_MAX_DISTINCT * len(names):
+        return names.astype('category')
+    return names
+
+def _simple_artist(artists):
+    # First credited artist, lower-cased: 'Queen;David Bowie' -> 'queen'
+    return artists.str.lower().str.split(';').str[0].str.split(',').str[0]
+
+def apply_schema(df):
+    """
+    Returns the catalog columns of `df` with the schema dtypes. Rows with
+    an invalid track id, an unknown mood or no genre are dropped.
+    """
+    import pandas as pd
+
+    columns = CATALOG_COLUMNS + probability_columns(df.columns)
+    df = df[columns].copy()
+    df['app_mood'] = pd.Categorical(df['app_mood'], categories=APP_MOODS)
+    for col in DICTIONARY_COLUMNS:
+        df[col] = df[col].astype('category')
+    df['track_name'] = _encode_names(df['track_name'])
+    for col in probability_columns(columns):
+        df[col] = df[col].astype(PROBABILITY_DTYPE)
+
+    keep = valid_track_ids(df['track_id']) & df['app_mood'].notna().to_numpy() & df['super_genre'].notna().to_numpy()
+    if not keep.all():
+        print(f"Schema: dropping {int((~keep).sum())} rows with an invalid track id, unknown mood or no genre.")
+        df = df[keep]
+    return df.reset_index(drop=True)
+
+def read_catalog(path):
+    """
+    Reads valora_database.csv into (frame, track_ids). The frame has every
+    catalog column except track_id plus the derived artist_simple;
+    track_ids is the row-aligned 'S22' array.
+    """
+    import pandas as pd
+
+    header = pd.read_csv(path, nrows=0).columns
+    dtypes = {col: 'category' for col in DICTIONARY_COLUMNS}
+    dtypes['app_mood'] = pd.CategoricalDtype(APP_MOODS)
+    dtypes['track_id'] = 'string'
+    df = pd.read_csv(path, dtype={c: t for c, t in dtypes.items() if c in header})
+
+    keep = valid_track_ids(df['track_id'])
+    if not keep.all():
+        print(f"Warning: skipping {int((~keep).sum())} catalog rows with an invalid track id.")
+        df = df[keep].reset_index(drop=True)
+    track_ids = df.pop('track_id').to_numpy(dtype=object).astype(ID_DTYPE)
+    if 'track_name' in df.columns:
+        df['track_name'] = _encode_names(df['track_name'])
+
+    for col in probability_columns(df.columns):
+        df[col] = df[col].astype(PROBABILITY_DTYPE)
+    # Derive on the distinct artist strings only, then map the codes across
+    artists = df['artists'].cat
+    simple = _simple_artist(pd.Series(artists.categories))
+    categories, mapping = np.unique(simple.to_numpy(dtype=str), return_inverse=True)
+    codes = np.where(artists.codes.to_numpy() >= 0, mapping[artists.codes.to_numpy()], -1)
+    df['artist_simple'] = pd.Categorical.from_codes(codes, categories=categories)
+    return df, track_ids
@@ -2,7 +2,9 @@
 import pandas as pd
 import numpy as np
 import os
+import argparse
 from tqdm import tqdm
+from pipeline_profiler import PipelineProfiler, add_profile_arguments
 
 # --- Configuration ---
 FILE_A = 'spotify_huggingface.csv'
@@ -56,51 +58,58 @@ def create_super_genre(genre_str):
     return 'Other'
 
 # --- Main Processing Function ---
-def process_data():
+def process_data(profiler=None):
+    profiler = profiler or PipelineProfiler('dataprocessing')
     tqdm.pandas(desc="Applying functions")
     
-    # --- Load Dataset A (spotify_huggingface.csv) ---
-    print(f"Loading {FILE_A}...")
-    try:
-        df_a = pd.read_csv(FILE_A)
-        if df_a.columns[0].startswith('Unnamed'):
-            df_a = df_a.drop(df_a.columns[0], axis=1)
-        cols_to_keep_a = ['track_id', 'track_name', 'artists', 'track_genre'] + TRAINING_FEATURES
-        df_a = df_a[cols_to_keep_a]
-        print(f"Loaded {len(df_a)} rows from {FILE_A}.")
-    except Exception as e:
-        print(f"Error loading {FILE_A}: {e}"); return
+    with profiler.stage('load') as stage:
+        # --- Load Dataset A (spotify_huggingface.csv) ---
+        print(f"Loading {FILE_A}...")
+        try:
+            df_a = pd.read_csv(FILE_A)
+            if df_a.columns[0].startswith('Unnamed'):
+                df_a = df_a.drop(df_a.columns[0], axis=1)
+            cols_to_keep_a = ['track_id', 'track_name', 'artists', 'track_genre'] + TRAINING_FEATURES
+            df_a = df_a[cols_to_keep_a]
+            print(f"Loaded {len(df_a)} rows from {FILE_A}.")
+        except Exception as e:
+            print(f"Error loading {FILE_A}: {e}"); return
 
-    # --- Load Dataset B (data_moods.csv) ---
-    print(f"\nLoading {FILE_B}...")
-    try:
-        df_b = pd.read_csv(FILE_B)
-        cols_rename_b = {
-            'id': 'track_id', 'name': 'track_name', 'artist': 'artists',
-            **{feature: feature for feature in TRAINING_FEATURES}
-        }
-        df_b = df_b[list(cols_rename_b.keys())]
-        df_b = df_b.rename(columns=cols_rename_b)
-        df_b['track_genre'] = np.nan
-        print(f"Loaded {len(df_b)} rows from {FILE_B}.")
-    except Exception as e:
-        print(f"Error loading {FILE_B}: {e}"); return
+        # --- Load Dataset B (data_moods.csv) ---
+        print(f"\nLoading {FILE_B}...")
+        try:
+            df_b = pd.read_csv(FILE_B)
+            cols_rename_b = {
+                'id': 'track_id', 'name': 'track_name', 'artist': 'artists',
+                **{feature: feature for feature in TRAINING_FEATURES}
+            }
+            df_b = df_b[list(cols_rename_b.keys())]
+            df_b = df_b.rename(columns=cols_rename_b)
+            df_b['track_genre'] = np.nan
+            print(f"Loaded {len(df_b)} rows from {FILE_B}.")
+        except Exception as e:
+            print(f"Error loading {FILE_B}: {e}"); return
+        stage.rows = len(df_a) + len(df_b)
 
     # --- Combine Datasets ---
     print("\nCombining datasets...")
-    df_combined = pd.concat([df_a, df_b], ignore_index=True, sort=False)
+    with profiler.stage('concat') as stage:
+        df_combined = pd.concat([df_a, df_b], ignore_index=True, sort=False)
+        stage.rows = len(df_combined)
     
     # --- Clean Data ---
-    df_combined = df_combined.drop_duplicates(subset=['track_id'], keep='first')
-    df_combined = df_combined.dropna(subset=TRAINING_FEATURES)
+    with profiler.stage('dedupe', rows=len(df_combined)):
+        df_combined = df_combined.drop_duplicates(subset=['track_id'], keep='first')
+        df_combined = df_combined.dropna(subset=TRAINING_FEATURES)
     print(f"Total rows after deduplication & cleaning: {len(df_combined)}")
     
     # --- Create Labels ---
-    print("Creating super-genre labels...")
-    df_combined['super_genre'] = df_combined['track_genre'].progress_apply(create_super_genre)
-    
-    print("Creating 4-quadrant mood labels...")
-    df_combined['mood'] = df_combined.progress_apply(get_quadrant_mood, axis=1)
+    with profiler.stage('label', rows=len(df_combined)):
+        print("Creating super-genre labels...")
+        df_combined['super_genre'] = df_combined['track_genre'].progress_apply(create_super_genre)
+        
+        print("Creating 4-quadrant mood labels...")
+        df_combined['mood'] = df_combined.progress_apply(get_quadrant_mood, axis=1)
 
     # --- Final Output ---
     # Now we drop any rows that couldn't get a mood (e.g., missing valence/energy)
@@ -118,14 +127,18 @@ def process_data():
     print(df_final['super_genre'].value_counts())
     
     # --- Save to File ---
-    try:
-        df_final.to_csv(OUTPUT_FILE, index=False)
-        print(f"\n✅ Successfully saved cleaned data to '{OUTPUT_FILE}'.")
-    except Exception as e:
-        print(f"\nError: Could not save file. {e}")
+    with profiler.stage('save', rows=len(df_final)):
+        try:
+            df_final.to_csv(OUTPUT_FILE, index=False)
+            print(f"\n✅ Successfully saved cleaned data to '{OUTPUT_FILE}'.")
+        except Exception as e:
+            print(f"\nError: Could not save file. {e}")
 
 # --- Run the Script ---
 if __name__ == "__main__":
+    parser = add_profile_arguments(argparse.ArgumentParser(description="Combine and label the raw Spotify datasets."))
+    args = parser.parse_args()
+
     try:
         from tqdm import tqdm
         tqdm.pandas()
@@ -136,4 +149,6 @@ if __name__ == "__main__":
         from tqdm import tqdm
         tqdm.pandas()
         
-    process_data()
\ No newline at end of file
+    profiler = PipelineProfiler.from_args(args, 'dataprocessing')
+    process_data(profiler)
+    profiler.finish()
\ No newline at end of file
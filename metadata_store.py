@@ -0,0 +1,138 @@
+# In metadata_store.py
+"""
+Local store of Spotify display metadata for catalog tracks.
+
+valora_database.csv only has ids, names, artists and labels, so album art
+and links used to be fetched live for every recommendation. The offline
+enrichment stage (process_final_database.py --enrich-metadata) bulk-fetches
+them into a compact SQLite table instead, and the app serves straight
+from it, only going to Spotify for tracks that are missing or stale.
+
+Enrichment is resumable: each chunk is committed as soon as it is fetched,
+and a re-run skips ids that are already fresh.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+COLUMNS = ['track_id', 'name', 'artist', 'album_art', 'url', 'preview_url', 'fetched_at']
+
+def track_to_metadata(track_detail, fetched_at=None):
+    """Compacts a Spotify track object to the fields the app displays."""
+    images = (track_detail.get('album') or {}).get('images') or []
+    return {
+        'track_id': track_detail['id'],
+        'name': track_detail.get('name'),
+        'artist': track_detail['artists'][0]['name'] if track_detail.get('artists') else 'N/A',
+        'album_art': images[0]['url'] if images else None,
+        'url': (track_detail.get('external_urls') or {}).get('spotify'),
+        'preview_url': track_detail.get('preview_url'),
+        'fetched_at': fetched_at if fetched_at is not None else time.time(),
+    }
+
+class MetadataStore:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._conn().execute("""
+            CREATE TABLE IF NOT EXISTS track_metadata (
+                track_id TEXT PRIMARY KEY,
+                name TEXT,
+                artist TEXT,
+                album_art TEXT,
+                url TEXT,
+                preview_url TEXT,
+                fetched_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+
+    def _conn(self):
+        # One connection per thread; scheduler workers write back from their own threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get_many(self, track_ids):
+        """Returns {track_id: metadata dict} for the ids we have."""
+        track_ids = list(track_ids)
+        results = {}
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(track_ids), 500):
+            chunk = track_ids[i:i+500]
+            rows = self._conn().execute(
+                f"SELECT {', '.join(COLUMNS)} FROM track_metadata WHERE track_id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            for row in rows:
+                results[row[0]] = dict(zip(COLUMNS, row))
+        return results
+
+    def put_many(self, items):
+        """Upserts metadata dicts in one transaction (one checkpoint)."""
+        rows = [tuple(item.get(c) for c in COLUMNS) for item in items]
+        if not rows:
+            return 0
+        conn = self._conn()
+        with conn:
+            conn.execute("BEGIN")
+            conn.executemany(
+                f"INSERT OR REPLACE INTO track_metadata ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows,
+            )
+        return len(rows)
+
+    def ids_needing_refresh(self, track_ids, max_age_s):
+        """The ids that are missing from the store or older than `max_age_s`."""
+        cutoff = time.time() - max_age_s
+        have = self.get_many(track_ids)
+        return [tid for tid in track_ids if tid not in have or have[tid]['fetched_at'] < cutoff]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM track_metadata").fetchone()[0]
+
+def spotify_client_from_env(**client_kwargs):
+    """
+    Client-credentials spotipy client for offline jobs, using SPOTIFY_CLIENT_ID /
+    SPOTIFY_CLIENT_SECRET and honouring SPOTIFY_API_URL / SPOTIFY_ACCOUNTS_URL
+    (e.g. to run against benchmarks/fake_spotify.py).
+    """
+    import spotipy
+    from spotipy.oauth2 import SpotifyClientCredentials
+
+    auth = SpotifyClientCredentials(client_id=os.environ.get("SPOTIFY_CLIENT_ID"),
+                                    client_secret=os.environ.get("SPOTIFY_CLIENT_SECRET"))
+    if os.environ.get("SPOTIFY_ACCOUNTS_URL"):
+        auth.OAUTH_TOKEN_URL = os.environ["SPOTIFY_ACCOUNTS_URL"].rstrip('/') + '/api/token'
+    client = spotipy.Spotify(client_credentials_manager=auth, **client_kwargs)
+    if os.environ.get("SPOTIFY_API_URL"):
+        client.prefix = os.environ["SPOTIFY_API_URL"].rstrip('/') + '/'
+    return client
+
+def enrich_catalog(track_ids, store, scheduler, max_age_s, chunk_size=1000, progress=None):
+    """
+    Fetches metadata for every id that is missing or stale and writes it to
+    `store` chunk by chunk. `scheduler` (a SpotifyScheduler) handles batching,
+    throttling and 429 backoff. Returns (fetched, not_found).
+    """
+    track_ids = list(dict.fromkeys(track_ids))
+    todo = store.ids_needing_refresh(track_ids, max_age_s)
+    print(f"{len(track_ids) - len(todo)} tracks already have fresh metadata, {len(todo)} to fetch.")
+    if progress:
+        progress.update(len(track_ids) - len(todo))
+
+    fetched = not_found = 0
+    for i in range(0, len(todo), chunk_size):
+        chunk = todo[i:i+chunk_size]
+        # Only hand back what actually came back, so a failed chunk is retried on the next run
+        tracks = scheduler.get_tracks(chunk, timeout=None)
+        now = time.time()
+        fetched += store.put_many([track_to_metadata(t, now) for t in tracks.values()])
+        not_found += len(chunk) - len(tracks)
+        if progress:
+            progress.update(len(chunk))
+    return fetched, not_found
@@ -0,0 +1,199 @@
+# In pipeline_profiler.py
+"""
+Stage profiler for the offline data build (dataprocessing.py and
+process_final_database.py).
+
+Each stage records wall time, CPU time, peak RSS and rows/sec, and the
+whole run is written out as a JSON report. CPU time and RSS are this
+process's own; work farmed out to worker processes (joblib) is added
+with StageRecord.add_worker_usage() from what each task reports back
+via worker_usage(). Optionally the full run is
+also captured with cProfile (.prof) or pyinstrument (.html) so you can
+drill into a slow stage.
+
+Usage inside a pipeline script:
+
+    profiler = PipelineProfiler.from_args(args, 'dataprocessing')
+    with profiler.stage('load') as stage:
+        df = pd.read_csv(...)
+        stage.rows = len(df)
+    profiler.finish()
+"""
+import json
+import os
+import platform
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+def add_profile_arguments(parser):
+    """Adds the --profile options shared by the pipeline scripts."""
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--profile', action='store_true',
+                       help="Record wall/CPU time, peak RSS and rows/sec for each stage")
+    group.add_argument('--profile-report', default=None,
+                       help="Where to write the JSON report (default: profile_<script>.json)")
+    group.add_argument('--profile-dump', default=None,
+                       help="Also dump a full profile: *.html uses pyinstrument, anything else cProfile")
+    return parser
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (None if unknown)."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS reports bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except Exception:
+        return None
+
+def worker_usage(cpu_start):
+    """Called at the end of a task in a worker process: its pid, CPU since `cpu_start` and peak RSS."""
+    return {'pid': os.getpid(), 'cpu_s': time.process_time() - cpu_start, 'peak_rss_mb': peak_rss_mb()}
+
+class StageRecord:
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self.peak_rss_mb = None
+        self.worker_cpu_s = None
+        self._worker_peaks = {}  # pid -> peak RSS (MB) of each worker process
+
+    def add_worker_usage(self, usage):
+        """Adds one task's worker_usage() to the stage (tasks run in this process are already counted)."""
+        if usage['pid'] == os.getpid():
+            return
+        self.worker_cpu_s = (self.worker_cpu_s or 0.0) + usage['cpu_s']
+        if usage['peak_rss_mb'] is not None:
+            self._worker_peaks[usage['pid']] = max(self._worker_peaks.get(usage['pid'], 0.0), usage['peak_rss_mb'])
+
+    def to_dict(self):
+        rows_per_s = None
+        if self.rows is not None and self.wall_s > 0:
+            rows_per_s = round(self.rows / self.wall_s, 1)
+        return {
+            'stage': self.name,
+            'wall_s': round(self.wall_s, 4),
+            'cpu_s': round(self.cpu_s, 4),
+            'peak_rss_mb': round(self.peak_rss_mb, 1) if self.peak_rss_mb is not None else None,
+            'rows': self.rows,
+            'rows_per_s': rows_per_s,
+            # Worker processes, not included above. Their peaks are summed: the workers run side by side
+            'worker_cpu_s': round(self.worker_cpu_s, 4) if self.worker_cpu_s is not None else None,
+            'worker_peak_rss_mb': round(sum(self._worker_peaks.values()), 1) if self._worker_peaks else None,
+            'workers': len(self._worker_peaks) or None,
+        }
+
+class PipelineProfiler:
+    def __init__(self, script_name, enabled=False, report_path=None, dump_path=None):
+        self.script_name = script_name
+        self.enabled = enabled
+        self.report_path = report_path or f"profile_{script_name}.json"
+        self.dump_path = dump_path
+        self.stages = []
+        self._started_at = datetime.now()
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.process_time()
+        self._dumper = None
+
+        if self.enabled and self.dump_path:
+            self._start_dumper()
+
+    @classmethod
+    def from_args(cls, args, script_name):
+        return cls(script_name, enabled=args.profile,
+                   report_path=args.profile_report, dump_path=args.profile_dump)
+
+    def _start_dumper(self):
+        if self.dump_path.endswith('.html'):
+            try:
+                from pyinstrument import Profiler
+                self._dumper = ('pyinstrument', Profiler())
+                self._dumper[1].start()
+                return
+            except ImportError:
+                print("Warning: pyinstrument is not installed, falling back to cProfile.")
+                self.dump_path = os.path.splitext(self.dump_path)[0] + '.prof'
+        import cProfile
+        self._dumper = ('cprofile', cProfile.Profile())
+        self._dumper[1].enable()
+
+    def _stop_dumper(self):
+        kind, prof = self._dumper
+        if kind == 'pyinstrument':
+            prof.stop()
+            with open(self.dump_path, 'w', encoding='utf-8') as f:
+                f.write(prof.output_html())
+        else:
+            prof.disable()
+            prof.dump_stats(self.dump_path)
+        self._dumper = None
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Times one pipeline stage. Set `.rows` on the yielded record if the row count is only known at the end."""
+        record = StageRecord(name)
+        record.rows = rows
+        if not self.enabled:
+            yield record
+            return
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        finally:
+            record.wall_s = time.perf_counter() - wall_start
+            record.cpu_s = time.process_time() - cpu_start
+            record.peak_rss_mb = peak_rss_mb()
+            self.stages.append(record)
+
+    def report(self):
+        total_wall = time.perf_counter() - self._wall_start
+        return {
+            'script': self.script_name,
+            'started_at': self._started_at.isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'total_wall_s': round(total_wall, 4),
+            'total_cpu_s': round(time.process_time() - self._cpu_start, 4),
+            'peak_rss_mb': round(peak_rss_mb(), 1) if peak_rss_mb() is not None else None,
+            'stages': [s.to_dict() for s in self.stages],
+        }
+
+    def finish(self):
+        """Writes the JSON report (and profile dump) and prints a summary table."""
+        if not self.enabled:
+            return None
+        if self._dumper:
+            self._stop_dumper()
+            print(f"Profile dump written to '{self.dump_path}'.")
+
+        report = self.report()
+        with open(self.report_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"\n--- Stage Profile ({self.script_name}) ---")
+        print(f"{'stage':<12}{'wall s':>10}{'cpu s':>10}{'peak MB':>10}{'rows':>12}{'rows/s':>14}")
+        for s in report['stages']:
+            print(f"{s['stage']:<12}{s['wall_s']:>10.3f}{s['cpu_s']:>10.3f}"
+                  f"{s['peak_rss_mb'] if s['peak_rss_mb'] is not None else '-':>10}"
+                  f"{s['rows'] if s['rows'] is not None else '-':>12}"
+                  f"{s['rows_per_s'] if s['rows_per_s'] is not None else '-':>14}")
+        for s in report['stages']:
+            if s['worker_cpu_s'] is not None:
+                print(f"{s['stage']}: plus {s['worker_cpu_s']:.3f}s CPU and {s['worker_peak_rss_mb'] or '-'} MB "
+                      f"peak RSS in {s['workers'] or '?'} worker processes")
+        print(f"Total: {report['total_wall_s']:.3f}s wall, {report['total_cpu_s']:.3f}s CPU")
+        print(f"✅ Profile report written to '{self.report_path}'.")
+        return report
@@ -2,46 +2,94 @@
 import pandas as pd
 import joblib
 import os
+import time
 import numpy as np
+import argparse
 from tqdm import tqdm
+from pipeline_profiler import PipelineProfiler, add_profile_arguments, worker_usage
+from metadata_store import MetadataStore, enrich_catalog, spotify_client_from_env
+from spotify_scheduler import SpotifyScheduler, SCHEDULER_CLIENT_KWARGS
+from catalog_schema import apply_schema, mood_probability_column
 
 # --- Configuration ---
 INPUT_FILE = 'combined_processed.csv'
 MODELS_DIR = 'models'
 OUTPUT_FILE = 'valora_database.csv' # The final file for the app
+METADATA_DB = 'valora_metadata.db' # Album art / links for the app, filled by --enrich-metadata
+
+parser = add_profile_arguments(argparse.ArgumentParser(description="Build valora_database.csv for the app."))
+enrich = parser.add_argument_group('metadata enrichment')
+enrich.add_argument('--enrich-metadata', action='store_true',
+                    help="After building, fetch album art and links from Spotify into the metadata store")
+enrich.add_argument('--enrich-only', action='store_true',
+                    help=f"Skip the build and only enrich the existing '{OUTPUT_FILE}'")
+enrich.add_argument('--metadata-db', default=METADATA_DB)
+enrich.add_argument('--enrich-rate', type=float, default=5.0, help="Spotify calls per second (50 tracks per call)")
+enrich.add_argument('--max-age-days', type=float, default=30.0, help="Re-fetch metadata older than this")
+moods = parser.add_argument_group('mood probabilities')
+moods.add_argument('--mood-probabilities', action='store_true',
+                   help="Run the mood model over the whole catalog and store per-mood probabilities (float16)")
+moods.add_argument('--jobs', type=int, default=-1, help="Parallel worker processes for inference (-1 = all cores)")
+moods.add_argument('--chunk-size', type=int, default=20000, help="Rows per inference chunk")
+args = parser.parse_args()
+profiler = PipelineProfiler.from_args(args, 'process_final_database')
+
+def run_enrichment(track_ids):
+    """Fills the metadata store for `track_ids`. Safe to interrupt and re-run."""
+    print(f"\nEnriching metadata into '{args.metadata_db}' at {args.enrich_rate} calls/s...")
+    store = MetadataStore(args.metadata_db)
+    scheduler = SpotifyScheduler(lambda: spotify_client_from_env(**SCHEDULER_CLIENT_KWARGS),
+                                 rate_per_s=args.enrich_rate, burst=max(1, int(args.enrich_rate)))
+    with profiler.stage('enrich', rows=len(track_ids)):
+        with tqdm(total=len(track_ids), desc="Fetching metadata") as progress:
+            fetched, not_found = enrich_catalog(track_ids, store, scheduler, args.max_age_days * 86400,
+                                                progress=progress)
+    print(f"✅ Metadata store now has {store.count()} tracks ({fetched} fetched, {not_found} not found on Spotify).")
+
+if args.enrich_only:
+    try:
+        existing_ids = pd.read_csv(OUTPUT_FILE, usecols=['track_id'])['track_id'].dropna().tolist()
+    except FileNotFoundError:
+        print(f"FATAL ERROR: Could not find '{OUTPUT_FILE}'. Build it first (run without --enrich-only).")
+        exit()
+    run_enrichment(existing_ids)
+    profiler.finish()
+    exit()
 
 # --- 1. Load All Models and Processors ---
-print("Loading all trained models and processors...")
-try:
-    # Load Mood Model files
-    mood_model = joblib.load(os.path.join(MODELS_DIR, 'final_rf_model.joblib'))
-    mood_scaler = joblib.load(os.path.join(MODELS_DIR, 'final_scaler.joblib'))
-    mood_encoder = joblib.load(os.path.join(MODELS_DIR, 'final_encoder.joblib'))
-    mood_model_features = mood_scaler.feature_names_in_ 
+with profiler.stage('load') as stage:
+    print("Loading all trained models and processors...")
+    try:
+        # Load Mood Model files
+        mood_model = joblib.load(os.path.join(MODELS_DIR, 'final_rf_model.joblib'))
+        mood_scaler = joblib.load(os.path.join(MODELS_DIR, 'final_scaler.joblib'))
+        mood_encoder = joblib.load(os.path.join(MODELS_DIR, 'final_encoder.joblib'))
+        mood_model_features = mood_scaler.feature_names_in_ 
     
-    # Load Genre Model files
-    genre_model = joblib.load(os.path.join(MODELS_DIR, 'final_genre_model.joblib'))
-    genre_scaler = joblib.load(os.path.join(MODELS_DIR, 'final_genre_scaler.joblib'))
-    genre_encoder = joblib.load(os.path.join(MODELS_DIR, 'final_genre_encoder.joblib'))
-    genre_model_features = genre_scaler.feature_names_in_
+        # Load Genre Model files
+        genre_model = joblib.load(os.path.join(MODELS_DIR, 'final_genre_model.joblib'))
+        genre_scaler = joblib.load(os.path.join(MODELS_DIR, 'final_genre_scaler.joblib'))
+        genre_encoder = joblib.load(os.path.join(MODELS_DIR, 'final_genre_encoder.joblib'))
+        genre_model_features = genre_scaler.feature_names_in_
     
-    print("✅ All models loaded successfully.")
+        print("✅ All models loaded successfully.")
 
-except FileNotFoundError as e:
-    print(f"FATAL ERROR: Could not load a required model file. {e}")
-    print("Please run all 'train_...' scripts first.")
-    exit()
+    except FileNotFoundError as e:
+        print(f"FATAL ERROR: Could not load a required model file. {e}")
+        print("Please run all 'train_...' scripts first.")
+        exit()
 
-# --- 2. Load the Combined Dataset ---
-print(f"Loading dataset: {INPUT_FILE}...")
-try:
-    df = pd.read_csv(INPUT_FILE)
-except FileNotFoundError:
-    print(f"FATAL ERROR: Could not find '{INPUT_FILE}'.")
-    print("Please run 'dataprocessing.py' first.")
-    exit()
+    # --- 2. Load the Combined Dataset ---
+    print(f"Loading dataset: {INPUT_FILE}...")
+    try:
+        df = pd.read_csv(INPUT_FILE)
+    except FileNotFoundError:
+        print(f"FATAL ERROR: Could not find '{INPUT_FILE}'.")
+        print("Please run 'dataprocessing.py' first.")
+        exit()
 
-print(f"Loaded {len(df)} total tracks.")
+    print(f"Loaded {len(df)} total tracks.")
+    stage.rows = len(df)
 
 # --- 3. Predict Missing MOODS ---
 # We defined our moods from valence/energy for ALL tracks in dataprocessing.py
@@ -74,7 +122,58 @@ def get_quadrant_mood(row):
         return 'Sad/Melancholy'
 
 # Re-create the 'app_mood' column for ALL tracks to be 100% consistent
-df['app_mood'] = df.progress_apply(get_quadrant_mood, axis=1)
+with profiler.stage('label', rows=len(df)):
+    df['app_mood'] = df.progress_apply(get_quadrant_mood, axis=1)
+
+# --- 3b. Mood Probabilities (optional) ---
+# The quadrant label above is a hard bucket. With --mood-probabilities we also store
+# how confident the mood model (train_random_forest.py) is in each quadrant, so the
+# app can rank/weight tracks inside a bucket without calling the model per request.
+def predict_proba_chunk(model, X_chunk):
+    cpu_start = time.process_time()
+    model.n_jobs = 1  # We parallelise over chunks; don't let each worker spawn its own pool
+    probs = model.predict_proba(X_chunk)
+    # The profiler only sees the parent process, so each chunk reports the worker's usage back
+    return probs, worker_usage(cpu_start)
+
+mood_prob_columns = []
+if args.mood_probabilities:
+    from joblib import Parallel, delayed
+    try:
+        quadrant_model = joblib.load(os.path.join(MODELS_DIR, 'final_mood_model.joblib'))
+        quadrant_scaler = joblib.load(os.path.join(MODELS_DIR, 'final_mood_scaler.joblib'))
+        quadrant_encoder = joblib.load(os.path.join(MODELS_DIR, 'final_mood_encoder.joblib'))
+    except FileNotFoundError as e:
+        print(f"FATAL ERROR: Could not load the quadrant mood model. {e}")
+        print("Please run 'train_random_forest.py' first.")
+        exit()
+
+    quadrant_features = list(quadrant_scaler.feature_names_in_)
+    feature_mask = df[quadrant_features].notna().all(axis=1).to_numpy()
+    print(f"Predicting mood probabilities for {feature_mask.sum()} tracks with {args.jobs} jobs...")
+
+    with profiler.stage('mood_scale', rows=int(feature_mask.sum())):
+        X_mood_scaled = quadrant_scaler.transform(df.loc[feature_mask, quadrant_features]).astype(np.float32)
+
+    with profiler.stage('mood_predict', rows=int(feature_mask.sum())) as stage:
+        chunks = [X_mood_scaled[i:i+args.chunk_size] for i in range(0, len(X_mood_scaled), args.chunk_size)]
+        results = Parallel(n_jobs=args.jobs)(
+            delayed(predict_proba_chunk)(quadrant_model, chunk) for chunk in tqdm(chunks, desc="Mood inference")
+        )
+        for _, usage in results:
+            stage.add_worker_usage(usage)
+        chunk_probs = [chunk for chunk, _ in results]
+        probs = np.vstack(chunk_probs) if chunk_probs else np.empty((0, len(quadrant_encoder.classes_)))
+
+    # model.classes_ are encoded labels; map each probability column back to its mood name
+    for class_index, encoded in enumerate(quadrant_model.classes_):
+        mood = quadrant_encoder.inverse_transform([encoded])[0]
+        col = mood_probability_column(mood)
+        values = np.full(len(df), np.nan, dtype=np.float16)
+        values[feature_mask] = probs[:, class_index].astype(np.float16)
+        df[col] = values
+        mood_prob_columns.append(col)
+    print("Mood probability prediction complete.")
 
 # --- 4. Predict Missing SUPER-GENRES ---
 genre_missing_mask = df['super_genre'].isna()
@@ -89,12 +188,14 @@ if not tracks_to_predict_genre.empty:
         exit()
 
     # Scale features
-    X_genre = tracks_to_predict_genre[genre_model_features]
-    X_genre_scaled = genre_scaler.transform(X_genre)
+    with profiler.stage('scale', rows=len(tracks_to_predict_genre)):
+        X_genre = tracks_to_predict_genre[genre_model_features]
+        X_genre_scaled = genre_scaler.transform(X_genre)
     
     # Predict
-    genre_preds = genre_model.predict(X_genre_scaled)
-    genre_labels = genre_encoder.inverse_transform(genre_preds)
+    with profiler.stage('predict', rows=len(tracks_to_predict_genre)):
+        genre_preds = genre_model.predict(X_genre_scaled)
+        genre_labels = genre_encoder.inverse_transform(genre_preds)
     
     # Fill in the blanks
     df.loc[genre_missing_mask, 'super_genre'] = genre_labels
@@ -103,12 +204,10 @@ else:
     print("No missing super-genre labels to predict.")
 
 # --- 5. Save the Final Database ---
-# We only need the identifiers and the final predicted labels
-final_columns = ['track_id', 'track_name', 'artists', 'app_mood', 'super_genre']
-
-df_final = df[final_columns]
-# Drop any rows that still have nulls in our key labels
-df_final = df_final.dropna(subset=['app_mood', 'super_genre'])
+# We only need the identifiers and the final predicted labels, typed as in catalog_schema.py
+# (the app reads the file back with the same schema). Rows that still have nulls in our
+# key labels, or an id that isn't a Spotify track id, are dropped here.
+df_final = apply_schema(df)
 
 print(f"\nFinal database has {len(df_final)} tracks.")
 print("\nFinal App Mood Distribution:")
@@ -117,12 +216,21 @@ print("\nFinal Super-Genre Distribution:")
 print(df_final['super_genre'].value_counts())
 
 print(f"\nSaving final database to '{OUTPUT_FILE}'...")
-try:
-    df_final.to_csv(OUTPUT_FILE, index=False)
-    print(f"\n✅ Successfully saved final database to '{OUTPUT_FILE}'.")
-    print("Lets Build This Yankee Ass System!")
-except Exception as e:
-    print(f"\nFATAL ERROR: Could not save final file. Error: {e}")
+with profiler.stage('save', rows=len(df_final)):
+    try:
+        # Write to a temp file and rename, so a running app never reads a half-written catalog
+        tmp_file = OUTPUT_FILE + '.tmp'
+        df_final.to_csv(tmp_file, index=False, float_format='%.4g')
+        os.replace(tmp_file, OUTPUT_FILE)
+        print(f"\n✅ Successfully saved final database to '{OUTPUT_FILE}'.")
+        print("Lets Build This Yankee Ass System!")
+    except Exception as e:
+        print(f"\nFATAL ERROR: Could not save final file. Error: {e}")
+
+if args.enrich_metadata:
+    run_enrichment(df_final['track_id'].tolist())
+
+profiler.finish()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,241 @@
+# In session_store.py
+"""
+Server-side sessions for the web app.
+
+Flask's default session puts the whole Spotify token_info dict in a
+signed cookie, so every request carries it and every token refresh
+rewrites it. Here the cookie only holds a random opaque session id and
+the data lives in a store:
+
+- SQLiteSessionStore: an on-disk table indexed by id and expiry, shared
+  by all workers on the same machine.
+- MemorySessionStore: a local in-process stand-in (single worker / dev).
+
+Expired rows are swept periodically from the save path.
+"""
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from flask.sessions import SessionInterface, SessionMixin, session_json_serializer
+from werkzeug.datastructures import CallbackDict
+
+class SessionStore(ABC):
+    """Interface for session backends. Data is stored already serialized (str)."""
+
+    @abstractmethod
+    def load(self, sid, now):
+        """(data, expires_at) for a live session, or None."""
+
+    @abstractmethod
+    def save(self, sid, data, expires_at):
+        """Inserts or replaces the session."""
+
+    @abstractmethod
+    def touch(self, sid, expires_at):
+        """Moves the expiry without rewriting the data."""
+
+    @abstractmethod
+    def delete(self, sid):
+        """Removes the session if it exists."""
+
+    @abstractmethod
+    def sweep(self, now):
+        """Removes expired sessions. Returns how many were removed."""
+
+class MemorySessionStore(SessionStore):
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def load(self, sid, now):
+        with self._lock:
+            row = self._data.get(sid)
+        if row is None or row[1] < now:
+            return None
+        return row
+
+    def save(self, sid, data, expires_at):
+        with self._lock:
+            self._data[sid] = (data, expires_at)
+
+    def touch(self, sid, expires_at):
+        with self._lock:
+            if sid in self._data:
+                self._data[sid] = (self._data[sid][0], expires_at)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+    def sweep(self, now):
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._data.items() if expires_at < now]
+            for sid in expired:
+                del self._data[sid]
+        return len(expired)
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _conn(self):
+        # sqlite3 connections can't be shared between threads, so keep one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid, now):
+        return self._conn().execute(
+            "SELECT data, expires_at FROM sessions WHERE sid = ? AND expires_at >= ?", (sid, now)
+        ).fetchone()
+
+    def save(self, sid, data, expires_at):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)", (sid, data, expires_at)
+        )
+
+    def touch(self, sid, expires_at):
+        self._conn().execute("UPDATE sessions SET expires_at = ? WHERE sid = ?", (expires_at, sid))
+
+    def delete(self, sid):
+        self._conn().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def sweep(self, now):
+        return self._conn().execute("DELETE FROM sessions WHERE expires_at < ?", (now,)).rowcount
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    def __init__(self, initial=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.modified = False
+        self.accessed = False
+        self.cleared = False
+
+    # Reads mark the session accessed (as Flask's cookie session does), so the
+    # response gets `Vary: Cookie` whenever it may depend on who is asking
+    def __getitem__(self, key):
+        self.accessed = True
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed = True
+        return super().get(key, default)
+
+    def setdefault(self, key, default=None):
+        self.accessed = True
+        return super().setdefault(key, default)
+
+    def clear(self):
+        # Whatever is stored next (e.g. a login) gets a fresh sid, see save_session
+        self.cleared = True
+        super().clear()
+
+class ServerSideSessionInterface(SessionInterface):
+    serializer = session_json_serializer
+
+    def __init__(self, store, sweep_interval_s=300):
+        self.store = store
+        self.sweep_interval_s = sweep_interval_s
+        self._next_sweep = 0.0
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            row = self.store.load(sid, time.time())
+            if row is not None:
+                data, expires_at = row
+                try:
+                    return ServerSideSession(self.serializer.loads(data), sid=sid, expires_at=expires_at)
+                except Exception:
+                    pass  # Corrupt row, start a fresh session
+        return ServerSideSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session:
+            # session.clear() on a stored session: drop it on both sides
+            if session.modified and session.sid:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.cleared and session.sid:
+            # Refilled after clear() (a login): never carry the old sid over, or
+            # anyone who planted or saw it would share the new session
+            self.store.delete(session.sid)
+            session.sid = None
+
+        now = time.time()
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        expires_at = now + lifetime
+        new_sid = session.sid is None
+
+        if new_sid:
+            session.sid = secrets.token_urlsafe(32)
+        if new_sid or session.modified:
+            self.store.save(session.sid, self.serializer.dumps(dict(session)), expires_at)
+        elif session.expires_at - now < lifetime / 2:
+            # Sliding expiry without rewriting the row (or the cookie) on every request
+            self.store.touch(session.sid, expires_at)
+        else:
+            self._maybe_sweep(now)
+            return
+
+        response.set_cookie(
+            name,
+            session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+        self._maybe_sweep(now)
+
+    def _maybe_sweep(self, now):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.sweep_interval_s
+        try:
+            removed = self.store.sweep(now)
+            if removed:
+                print(f"Swept {removed} expired sessions.")
+        except Exception as e:
+            print(f"Warning: session sweep failed: {e}")
+
+def create_session_interface(backend, db_path, sweep_interval_s=300):
+    """Returns a session interface for 'sqlite' or 'memory', or None to keep Flask's cookie sessions."""
+    if backend == 'sqlite':
+        return ServerSideSessionInterface(SQLiteSessionStore(db_path), sweep_interval_s)
+    if backend == 'memory':
+        return ServerSideSessionInterface(MemorySessionStore(), sweep_interval_s)
+    if backend == 'cookie':
+        return None
+    raise ValueError(f"Unknown session backend '{backend}' (expected sqlite, memory or cookie)")
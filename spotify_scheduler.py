@@ -0,0 +1,218 @@
+# In spotify_scheduler.py
+"""
+Shared scheduler for Spotify track lookups.
+
+All `tracks()` calls from the app go through one SpotifyScheduler so that:
+
+- concurrent lookups for the same ids are merged into one batched call
+  (an id that is already queued or in flight just joins its Future),
+- calls are paced by a token bucket, and a 429 pauses the bucket for the
+  server's Retry-After instead of failing the batch,
+- interactive requests jump ahead of background prefetch work,
+- failed batches are retried a few times before giving up on those ids.
+
+Callers get back whatever resolved within their timeout and decide how
+to fill the gaps, so a rate-limited Spotify means slower, not emptier,
+playlists.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, wait
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREFETCH = 10
+
+# spotipy keyword arguments for clients handed to a SpotifyScheduler. Its own retries
+# are off, and 429 is left out of the status list (spotipy falls back to a list with
+# 429 when it's empty), so a 429 reaches us with its Retry-After header instead of as
+# a header-less "Max Retries" error.
+SCHEDULER_CLIENT_KWARGS = {'retries': 0, 'status_retries': 0, 'status_forcelist': (500, 502, 503, 504)}
+
+class TokenBucket:
+    def __init__(self, rate_per_s, burst):
+        self.rate = float(rate_per_s)
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (used for Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0.0
+            # Refill from the end of the pause, so it doesn't release a burst when it lifts
+            self._updated = self._paused_until
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                    self._updated = now
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return
+                    delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+
+class _Lookup:
+    def __init__(self, priority):
+        self.future = Future()
+        self.priority = priority  # Best (lowest) priority of everyone waiting on this id
+        self.in_flight = False
+        self.attempts = 0
+
+class SpotifyScheduler:
+    def __init__(self, client_factory, rate_per_s=10, burst=20, batch_size=50,
+                 max_attempts=4, workers=2, linger_s=0.01):
+        self.client_factory = client_factory
+        self.bucket = TokenBucket(rate_per_s, burst)
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.linger_s = linger_s
+        self.stats = {'calls': 0, 'ids_requested': 0, 'ids_coalesced': 0, 'rate_limited': 0, 'failed_ids': 0}
+
+        self._lookups = {}   # track id -> _Lookup, while queued or in flight
+        self._queue = []     # heap of (priority, seq, track id)
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._workers = [
+            threading.Thread(target=self._run, name=f'valora-spotify-{i}', daemon=True) for i in range(workers)
+        ]
+        for w in self._workers:
+            w.start()
+
+    # --- Public API ---
+    def submit(self, track_ids, priority=PRIORITY_INTERACTIVE):
+        """Queues lookups and returns {track_id: Future}. Futures resolve to the track dict or None."""
+        futures = {}
+        with self._cond:
+            for tid in dict.fromkeys(track_ids):
+                self.stats['ids_requested'] += 1
+                lookup = self._lookups.get(tid)
+                if lookup is not None:
+                    self.stats['ids_coalesced'] += 1
+                    if priority < lookup.priority:
+                        # Someone is waiting on it now; let it overtake the prefetch entry
+                        lookup.priority = priority
+                        if not lookup.in_flight:
+                            heapq.heappush(self._queue, (priority, next(self._seq), tid))
+                else:
+                    lookup = self._lookups[tid] = _Lookup(priority)
+                    heapq.heappush(self._queue, (priority, next(self._seq), tid))
+                futures[tid] = lookup.future
+            self._cond.notify_all()
+        return futures
+
+    def get_tracks(self, track_ids, priority=PRIORITY_INTERACTIVE, timeout=10):
+        """Returns {track_id: track} for the ids that resolved within `timeout`."""
+        futures = self.submit(track_ids, priority)
+        wait(futures.values(), timeout=timeout)
+        results = {}
+        for tid, future in futures.items():
+            if future.done() and future.result() is not None:
+                results[tid] = future.result()
+        return results
+
+    def prefetch(self, track_ids):
+        """Background lookups that only run when no interactive work is waiting."""
+        return self.submit(track_ids, PRIORITY_PREFETCH)
+
+    # --- Dispatcher ---
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            if len(self._queue) < self.batch_size and self.linger_s:
+                # Give concurrent requests a moment to add their ids to this batch
+                self._cond.wait(self.linger_s)
+
+            batch, priority = [], None
+            while self._queue and len(batch) < self.batch_size:
+                prio, _, tid = self._queue[0]
+                lookup = self._lookups.get(tid)
+                if lookup is None or lookup.in_flight or prio != lookup.priority:
+                    heapq.heappop(self._queue)  # Stale entry (done, in flight, or re-queued at a better priority)
+                    continue
+                if priority is not None and prio != priority:
+                    break  # Don't let prefetch ids ride along and delay an interactive batch
+                priority = prio
+                heapq.heappop(self._queue)
+                lookup.in_flight = True  # Further duplicates just share the future
+                batch.append(tid)
+            return batch
+
+    def _finish(self, tids, results):
+        with self._cond:
+            lookups = [(tid, self._lookups.pop(tid, None)) for tid in tids]
+        for tid, lookup in lookups:
+            if lookup is not None and not lookup.future.done():
+                lookup.future.set_result(results.get(tid))
+
+    def _requeue(self, tids, count_attempt=True):
+        failed = []
+        with self._cond:
+            for tid in tids:
+                lookup = self._lookups.get(tid)
+                if lookup is None:
+                    continue
+                if count_attempt:
+                    lookup.attempts += 1
+                if lookup.attempts >= self.max_attempts:
+                    failed.append(tid)
+                else:
+                    lookup.in_flight = False
+                    heapq.heappush(self._queue, (lookup.priority, next(self._seq), tid))
+            self._cond.notify_all()
+        if failed:
+            self.stats['failed_ids'] += len(failed)
+            self._finish(failed, {})
+
+    def _run(self):
+        client = None
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            self.bucket.acquire()
+            try:
+                if client is None:
+                    client = self.client_factory()
+                    if client is None:
+                        raise RuntimeError("Could not create a Spotify client")
+                self.stats['calls'] += 1
+                tracks = client.tracks(batch)['tracks']
+                self._finish(batch, {t['id']: t for t in tracks if t})
+            except Exception as e:
+                status = getattr(e, 'http_status', None)
+                headers = getattr(e, 'headers', None)
+                if status == 429 and headers is not None:
+                    self.stats['rate_limited'] += 1
+                    try:
+                        retry_after = float(headers.get('Retry-After', 1))
+                    except (TypeError, ValueError):
+                        retry_after = 1.0
+                    print(f"Spotify rate limit hit, pausing for {retry_after}s and re-queueing {len(batch)} ids.")
+                    self.bucket.pause(retry_after)
+                    # Rate limiting isn't the batch's fault, so it doesn't count as an attempt
+                    self._requeue(batch, count_attempt=False)
+                elif status is not None and 400 <= status < 500 and status not in (401, 408, 429):
+                    print(f"Error getting Spotify track details batch: {e}")
+                    self.stats['failed_ids'] += len(batch)
+                    self._finish(batch, {})
+                else:
+                    # Network error, 5xx (which spotipy reports as a header-less 429) or
+                    # expired credentials: fresh client and retry with backoff
+                    print(f"Error getting Spotify track details batch (will retry): {e}")
+                    client = None
+                    self._requeue(batch)
+                    time.sleep(0.2)
+
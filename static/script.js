@@ -288,12 +288,22 @@ document.addEventListener('DOMContentLoaded', () => {
             try {
                 const response = await fetch('/get_recommendations', {
                     method: 'POST',
-                    headers: { 'Content-Type': 'application/json' },
+                    headers: {
+                        'Content-Type': 'application/json',
+                        // Ask for NDJSON so songs appear as their details arrive
+                        'Accept': 'application/x-ndjson, application/json;q=0.9'
+                    },
                     body: JSON.stringify({ 
                         mood: mood
                     }),
                 });
                 
+                const contentType = response.headers.get('Content-Type') || '';
+                if (response.ok && contentType.includes('application/x-ndjson')) {
+                    await readRecommendationStream(response, loadingDiv, msgP);
+                    return;
+                }
+
                 if (loadingDiv) loadingDiv.style.display = 'none';
                 const data = await response.json();
 
@@ -323,28 +333,82 @@ document.addEventListener('DOMContentLoaded', () => {
                 recommendationsList.innerHTML = `<p class="error-message">Failed to fetch recommendations. ${error.message}</p>`;
             }
         }
+
+        // Reads an NDJSON recommendation stream line by line (see "Streaming Responses" in app.py).
+        // One placeholder per song is laid out on "start" and filled in as "tracks" lines arrive.
+        async function readRecommendationStream(response, loadingDiv, msgP) {
+            let slots = [];
+
+            const handleEvent = (event) => {
+                if (event.type === 'start') {
+                    if (loadingDiv) loadingDiv.style.display = 'none';
+                    if (msgP && event.message) msgP.textContent = event.message;
+                    currentRecommendationIds = event.ids || [];
+                    recommendationsList.innerHTML = '';
+                    slots = currentRecommendationIds.map(() => {
+                        const slot = document.createElement('div');
+                        slot.classList.add('recommendation-item', 'pending');
+                        recommendationsList.appendChild(slot);
+                        return slot;
+                    });
+                } else if (event.type === 'tracks') {
+                    event.items.forEach(song => {
+                        const slot = slots[song.index];
+                        if (slot) slot.replaceWith(slots[song.index] = renderSong(song));
+                    });
+                } else if (event.type === 'done') {
+                    if (addAllButton && currentRecommendationIds.length > 0) addAllButton.style.display = 'inline-block';
+                } else if (event.type === 'error') {
+                    throw new Error(event.error);
+                }
+            };
+
+            const handleLines = (text) => {
+                text.split('\n').filter(line => line.trim()).forEach(line => handleEvent(JSON.parse(line)));
+            };
+
+            if (!response.body || !window.TextDecoder) {
+                handleLines(await response.text());  // No streaming support: handle it all at once
+                return;
+            }
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { done, value } = await reader.read();
+                buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+                const lastNewline = buffer.lastIndexOf('\n');
+                if (lastNewline >= 0) {
+                    handleLines(buffer.slice(0, lastNewline));
+                    buffer = buffer.slice(lastNewline + 1);
+                }
+                if (done) break;
+            }
+            handleLines(buffer);
+        }
         
+        function renderSong(song) {
+            const item = document.createElement('div');
+            item.classList.add('recommendation-item');
+            
+            const albumArt = song.album_art || 'https://via.placeholder.com/100?text=No+Art';
+
+            item.innerHTML = `
+                <a href="${song.url}" target="_blank" title="Listen on Spotify">
+                    <img src="${albumArt}" alt="Album Art">
+                </a>
+                <div class="recommendation-details">
+                    <h3>${song.name || 'Unknown Track'}</h3>
+                    <p>${song.artist || 'Unknown Artist'}</p>
+                    <p><span class="genre-badge">${song.super_genre}</span></p>
+                </div>
+            `;
+            return item;
+        }
+
         function displaySongs(recommendations) {
              recommendationsList.innerHTML = ''; 
-             recommendations.forEach(song => {
-                const item = document.createElement('div');
-                item.classList.add('recommendation-item');
-                
-                const albumArt = song.album_art || 'https://via.placeholder.com/100?text=No+Art';
-
-                item.innerHTML = `
-                    <a href="${song.url}" target="_blank" title="Listen on Spotify">
-                        <img src="${albumArt}" alt="Album Art">
-                    </a>
-                    <div class="recommendation-details">
-                        <h3>${song.name || 'Unknown Track'}</h3>
-                        <p>${song.artist || 'Unknown Artist'}</p>
-                        <p><span class="genre-badge">${song.super_genre}</span></p>
-                    </div>
-                `;
-                
-                recommendationsList.appendChild(item);
-            });
+             recommendations.forEach(song => recommendationsList.appendChild(renderSong(song)));
         }
         
         async function handleAddAllToPlaylist() {
@@ -0,0 +1,123 @@
+# In weighted_sampling.py
+"""
+Weighted sampling over a mood bucket.
+
+The weights (e.g. mood-model confidence) are turned into a cumulative sum
+once, when the catalog snapshot is built. A request then draws k tracks
+without replacement with k binary searches instead of re-normalising the
+whole bucket: draw a point in [0, total), find its position with
+searchsorted, and redraw if that position was already taken.
+
+Per-user scores (liked songs, artists the user likes) go in a BoostOverlay:
+a small {position: extra weight} map that sits on top of the shared prefix
+sums. A draw first picks "base" or "overlay" in proportion to their totals,
+so each position ends up with probability proportional to base + extra,
+and the shared arrays are never rebuilt or copied for a user.
+"""
+import numpy as np
+
+class BoostOverlay:
+    """Extra weight for a handful of positions in one bucket, for one request/user."""
+
+    def __init__(self):
+        self._parts = []  # (positions array, amount) in the order they were added
+        self._arrays = None
+
+    def add(self, positions, amount):
+        positions = np.asarray(positions, dtype=np.int64)
+        if amount > 0 and len(positions):
+            self._parts.append((positions, float(amount)))
+            self._arrays = None
+        return self
+
+    def __len__(self):
+        return len(self.arrays()[0])
+
+    def arrays(self):
+        """(unique positions, cumulative extra weights), built once per overlay."""
+        if self._arrays is None:
+            if not self._parts:
+                self._arrays = (np.empty(0, dtype=np.int64), np.empty(0))
+            else:
+                positions = np.concatenate([p for p, _ in self._parts])
+                amounts = np.concatenate([np.full(len(p), a) for p, a in self._parts])
+                unique, inverse = np.unique(positions, return_inverse=True)
+                self._arrays = (unique, np.cumsum(np.bincount(inverse, weights=amounts)))
+        return self._arrays
+
+class CumulativeWeights:
+    def __init__(self, weights):
+        weights = np.asarray(weights, dtype=np.float64)
+        # Missing scores get the bucket average instead of dropping out of the draw
+        if np.isnan(weights).any():
+            fill = np.nanmean(weights) if not np.isnan(weights).all() else 1.0
+            weights = np.where(np.isnan(weights), fill, weights)
+        weights = np.clip(weights, 0.0, None)
+        self.n = len(weights)
+        self.weights = weights
+        self.cum = np.cumsum(weights)
+        self.total = float(self.cum[-1]) if self.n else 0.0
+        self.order = np.argsort(-weights, kind='stable')  # Highest weight first
+
+    def mean_weight(self):
+        return self.total / self.n if self.n else 0.0
+
+    def draw(self, k, exclude=(), rng=None, overlay=None):
+        """
+        Returns up to k distinct positions, each drawn with probability proportional
+        to its weight plus any extra weight from `overlay`.
+        """
+        rng = rng or np.random.default_rng()
+        taken = set(int(p) for p in exclude)
+        available = self.n - len(taken)
+        k = min(k, available)
+        if overlay is not None and len(overlay):
+            boost_positions, boost_cum = overlay.arrays()
+            boost_total = float(boost_cum[-1])
+        else:
+            boost_positions = boost_cum = None
+            boost_total = 0.0
+        if k <= 0 or self.total + boost_total <= 0:
+            return []
+
+        picks = []
+        attempts = 0
+        # Rejection is cheap while the excluded mass is small, which is the normal case (k << n)
+        while len(picks) < k and attempts < 4 * k + 16:
+            attempts += 1
+            u = rng.random() * (self.total + boost_total)
+            if u < boost_total:
+                pos = int(boost_positions[min(np.searchsorted(boost_cum, u, side='right'), len(boost_cum) - 1)])
+            else:
+                pos = min(int(np.searchsorted(self.cum, u - boost_total, side='right')), self.n - 1)
+                if self.weights[pos] <= 0:
+                    continue
+            if pos in taken:
+                continue
+            taken.add(pos)
+            picks.append(pos)
+
+        if len(picks) < k:
+            # Too many rejections (tiny bucket or heavy exclusions): finish with an exact draw
+            weights = self.weights.copy()
+            if boost_positions is not None:
+                np.add.at(weights, boost_positions, np.diff(boost_cum, prepend=0.0))
+            mask = np.ones(self.n, dtype=bool)
+            mask[list(taken)] = False
+            remaining = np.flatnonzero(mask & (weights > 0))
+            need = min(k - len(picks), len(remaining))
+            if need > 0:
+                p = weights[remaining] / weights[remaining].sum()
+                picks.extend(int(x) for x in rng.choice(remaining, size=need, replace=False, p=p))
+        return picks
+
+    def top(self, k, exclude=()):
+        """The k highest-weight positions not in `exclude` (for ranked playlists)."""
+        taken = set(int(p) for p in exclude)
+        picks = []
+        for pos in self.order:
+            if len(picks) >= k:
+                break
+            if int(pos) not in taken:
+                picks.append(int(pos))
+        return picks